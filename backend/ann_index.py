@@ -0,0 +1,207 @@
+import math
+import time
+import faiss
+import numpy as np
+
+# Supported index types, from exact to most compressed
+INDEX_TYPES = ('flat', 'ivf', 'hnsw', 'ivfpq')
+
+# Default search-time knobs
+DEFAULT_NPROBE = 16
+DEFAULT_EF_SEARCH = 64
+
+# HNSW graph degree and bits per PQ code
+HNSW_M = 32
+PQ_NBITS = 8
+
+
+def default_nlist(n_vectors):
+    """Number of IVF cells for a catalog size (~4*sqrt(n), with >= 39 training points per cell)"""
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def default_pq_m(dimension):
+    """Largest number of PQ sub-quantizers <= dimension / 8 that divides the dimension"""
+    for m in range(max(1, dimension // 8), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def supports_removal(index_type):
+    """HNSW graphs cannot drop vectors, so changed products force a rebuild"""
+    return index_type != 'hnsw'
+
+
+def create_index(index_type, dimension, train_vectors, nlist=None):
+    """
+    Create an empty index of the given type that accepts add_with_ids
+
+    Args:
+        index_type (str): One of INDEX_TYPES
+        dimension (int): Embedding dimension
+        train_vectors (np.ndarray): Catalog embeddings used to train IVF/PQ quantizers
+        nlist (int): Number of IVF cells, derived from the catalog size if not given
+
+    Returns:
+        tuple: (index, actual index type) - falls back to 'flat' when there are too
+        few vectors to train the requested index
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}, expected one of {INDEX_TYPES}")
+
+    n_vectors = len(train_vectors)
+    if index_type in ('ivf', 'ivfpq'):
+        nlist = nlist or default_nlist(n_vectors)
+        min_train = max(nlist, 2 ** PQ_NBITS if index_type == 'ivfpq' else 1, 39)
+        if n_vectors < min_train:
+            print(f"Only {n_vectors} vectors, too few to train a {index_type} index; using flat")
+            index_type = 'flat'
+
+    if index_type == 'flat':
+        return faiss.IndexIDMap(faiss.IndexFlatL2(dimension)), index_type
+    if index_type == 'hnsw':
+        return faiss.IndexIDMap(faiss.IndexHNSWFlat(dimension, HNSW_M)), index_type
+
+    quantizer = faiss.IndexFlatL2(dimension)
+    if index_type == 'ivf':
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+    else:
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, default_pq_m(dimension), PQ_NBITS)
+    index.train(np.ascontiguousarray(train_vectors, dtype='float32'))
+    return index, index_type
+
+
+def search_params(index_type, nprobe=DEFAULT_NPROBE, ef_search=DEFAULT_EF_SEARCH, sel=None):
+    """Per-query search parameters for an index type (None when there is nothing to set)"""
+    if index_type in ('ivf', 'ivfpq'):
+        return faiss.SearchParametersIVF(nprobe=nprobe, sel=sel)
+    if index_type == 'hnsw':
+        return faiss.SearchParametersHNSW(efSearch=ef_search, sel=sel)
+    if sel is not None:
+        return faiss.SearchParameters(sel=sel)
+    return None
+
+
+def exhaustive_params(index, index_type, sel=None):
+    """Search parameters that reach every vector: all IVF cells, or an HNSW candidate list as long as the index"""
+    if index_type in ('ivf', 'ivfpq'):
+        return search_params(index_type, nprobe=faiss.extract_index_ivf(index).nlist, sel=sel)
+    if index_type == 'hnsw':
+        return search_params(index_type, ef_search=max(index.ntotal, DEFAULT_EF_SEARCH), sel=sel)
+    return search_params(index_type, sel=sel)
+
+
+def filtered_search(index, index_type, queries, mask, k, nprobe=DEFAULT_NPROBE, ef_search=DEFAULT_EF_SEARCH):
+    """
+    Search only among the ids allowed by a boolean mask over the id space
+
+    The mask is handed to FAISS as a bitmap selector so excluded products are
+    skipped during the search itself. nprobe/efSearch bound how much of the index a
+    search visits, so when a restrictive mask leaves queries short they are searched
+    again over the whole index. If the index can't apply a selector, k is doubled
+    until enough allowed neighbours are found.
+
+    Args:
+        index: FAISS index holding vectors under ids < len(mask)
+        index_type (str): One of INDEX_TYPES
+        queries (np.ndarray): float32 array of shape (n, dimension)
+        mask (np.ndarray): Boolean array, True for ids that may be returned
+        k (int): Number of results wanted per query
+
+    Returns:
+        list: For each query, up to k allowed ids, nearest first
+    """
+    k = min(k, int(mask.sum()))
+    if k == 0:
+        return [[] for _ in range(len(queries))]
+
+    try:
+        bitmap = np.packbits(mask, bitorder='little')
+        selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+        params = search_params(index_type, nprobe, ef_search, sel=selector)
+        _, labels = index.search(queries, k, params=params)
+        found = [[int(label) for label in row if label >= 0] for row in labels]
+        short = [i for i, ids in enumerate(found) if len(ids) < k]
+        if short and index_type != 'flat':
+            _, labels = index.search(queries[short], k, params=exhaustive_params(index, index_type, selector))
+            for i, row in zip(short, labels):
+                found[i] = [int(label) for label in row if label >= 0]
+        return found
+    except RuntimeError as e:
+        print(f"Filtered FAISS search not supported ({e}), expanding k instead")
+
+    # Adaptive k expansion: post-filter a growing number of unfiltered neighbours,
+    # visiting the whole index once every neighbour is needed
+    search_k = 2 * k
+    while True:
+        search_k = min(search_k, index.ntotal)
+        if search_k >= index.ntotal:
+            params = exhaustive_params(index, index_type)
+        else:
+            params = search_params(index_type, nprobe, ef_search)
+        _, labels = index.search(queries, search_k, params=params)
+        found = [[int(label) for label in row if 0 <= label < len(mask) and mask[label]][:k] for row in labels]
+        if all(len(ids) == k for ids in found) or search_k >= index.ntotal:
+            return found
+        search_k *= 2
+
+
+def recall_latency_report(vectors, queries, k=10, index_types=INDEX_TYPES,
+                          nprobes=(1, 4, 16, 64), ef_searches=(16, 32, 64, 128)):
+    """
+    Compare approximate indexes against the exact flat baseline
+
+    Args:
+        vectors (np.ndarray): Catalog embeddings
+        queries (np.ndarray): Query embeddings
+        k (int): Number of neighbours compared for recall@k
+        index_types (tuple): Index types to benchmark
+        nprobes (tuple): nprobe values tried for IVF indexes
+        ef_searches (tuple): efSearch values tried for HNSW
+
+    Returns:
+        list: One dict per (index type, setting) with recall@k, mean query latency
+        in ms and build time in s
+    """
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    ids = np.arange(len(vectors), dtype='int64')
+    k = min(k, len(vectors))
+
+    baseline = faiss.IndexFlatL2(vectors.shape[1])
+    baseline.add(vectors)
+    _, truth = baseline.search(queries, k)
+
+    report = []
+    for requested_type in index_types:
+        start = time.perf_counter()
+        index, index_type = create_index(requested_type, vectors.shape[1], vectors)
+        index.add_with_ids(vectors, ids)
+        build_seconds = time.perf_counter() - start
+
+        if index_type in ('ivf', 'ivfpq'):
+            settings = [{'nprobe': nprobe} for nprobe in nprobes]
+        elif index_type == 'hnsw':
+            settings = [{'ef_search': ef} for ef in ef_searches]
+        else:
+            settings = [{}]
+
+        for setting in settings:
+            params = search_params(index_type, **setting)
+            found = np.empty((len(queries), k), dtype='int64')
+            # One query at a time, the way requests are served
+            start = time.perf_counter()
+            for i in range(len(queries)):
+                _, found[i:i + 1] = index.search(queries[i:i + 1], k, params=params)
+            elapsed = time.perf_counter() - start
+
+            hits = sum(len(set(found[i]) & set(truth[i])) for i in range(len(queries)))
+            report.append({
+                'index_type': index_type,
+                **setting,
+                'recall_at_k': hits / (len(queries) * k),
+                'latency_ms': 1000 * elapsed / len(queries),
+                'build_seconds': build_seconds,
+            })
+    return report
@@ -1,58 +1,151 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
-import pymongo
-from pymongo import MongoClient
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import json
 import re
-from fashion_advice import get_fashion_advice
-from faqs import get_faq_answer
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from fashion_advice import get_fashion_advice, fashion_advice_responses
+from faqs import get_faq_answer, faq_answers, faq_store
 import faiss
-from gemini_handler import get_gemini_response
-from product_availability import check_product_availability
+from bson.objectid import ObjectId
+from gemini_handler import get_gemini_response, stream_gemini_response, stream_metrics, gemini_stats, GENERAL_FALLBACK, response_cache as gemini_response_cache
+from product_availability import check_product_availability, availability_index
+from mongo import get_collection, pool_metrics
+from embedding_store import EmbeddingStore
+from ann_index import create_index, filtered_search, supports_removal, recall_latency_report
+from catalog_snapshot import CatalogSnapshot
+from micro_batcher import MicroBatcher
+from encoders import load_encoder
+from query_cache import LRUCache, normalize_query
+from text_index import InvertedIndex, tokenize
+from hybrid_search import reciprocal_rank_fusion
+from translation_cache import CachedTranslator, TranslationMemory
 # Add new imports for language support
-from langdetect import detect, LangDetectException
+from language_id import LanguageIdentifier
+from intent_engine import analyze
+from semantic_router import SemanticRouter
 from googletrans import Translator
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
-
-# Initialize translator
-translator = Translator()
-
-# MongoDB connection
-MONGO_URI = os.getenv("MONGO_URI")
-client = MongoClient(MONGO_URI)
-db = client["test"]  # Using "test" database
-products_collection = db["products"]
-
-# Add debugging for MongoDB connection
-print(f"Connected to MongoDB: {MONGO_URI}")
-try:
-    # Test the connection
-    client.server_info()
-    print("Connection successful!")
-    print(f"Available databases: {client.list_database_names()}")
-    products_count = products_collection.count_documents({})
-    print(f"Products count: {products_count}")
-    if products_count == 0:
-        print("Warning: No products found in the collection!")
-except Exception as e:
-    print(f"MongoDB connection error: {e}")
-
-# Load sentence transformer model - this is free and works offline
-model = SentenceTransformer('all-MiniLM-L6-v2')  # Small model, good for products
-
-# Initialize FAISS index for fast similarity search
-embedding_size = model.get_sentence_embedding_dimension()
-index = faiss.IndexFlatL2(embedding_size)
-product_ids = []  # To keep track of product IDs corresponding to embeddings
+# Routes are registered on a blueprint; create_app() builds the Flask app
+api = Blueprint('api', __name__)
+
+# MongoDB connection (one shared client per process, connecting on first use)
+def products_collection():
+    return get_collection("products")
+
+# Sentence transformer model - this is free and works offline
+# ENCODER_BACKEND=quantized|onnx runs an int8/ONNX version of the same model on CPU,
+# loaded from ENCODER_MODEL_PATH (see encoders.py to build and benchmark it)
+MODEL_NAME = 'all-MiniLM-L6-v2'  # Small model, good for products
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "sentence-transformers")
+ENCODER_MODEL_PATH = os.getenv("ENCODER_MODEL_PATH")
+
+# The model, translator and index are loaded on first use or by the warm-up thread
+# started in create_app(), so importing this module is cheap
+model = None
+translator = None
+embedding_size = None
+embedding_store = None
+_load_lock = threading.Lock()
+_index_lock = threading.Lock()  # Serializes index updates
+# Held by searches, and by updates while they swap or change the live index,
+# catalog and id maps, so a search never sees them half updated
+_search_lock = threading.Lock()
+search_ready = threading.Event()  # Set once the model and index are loaded
+warmup_error = None
+
+# Directory holding the persisted FAISS index and the embedding cache
+INDEX_DIR = os.getenv("INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "index_data"))
+INDEX_META_PATH = os.path.join(INDEX_DIR, "products_index.json")
+INDEX_LOCK_PATH = os.path.join(INDEX_DIR, "products_index.lock")
+
+# SHARED_INDEX=1 lets worker processes share one physical copy of the index and
+# catalog snapshot: both are opened read-only with memory mapping, updates go through
+# a private copy under an inter-process file lock, and workers pick up new saved
+# versions within SHARED_INDEX_CHECK_SECONDS. The embedding cache in INDEX_DIR is
+# shared too; EmbeddingStore re-reads it under its own file lock before every write
+SHARED_INDEX = os.getenv("SHARED_INDEX", "0") == "1"
+SHARED_INDEX_CHECK_SECONDS = float(os.getenv("SHARED_INDEX_CHECK_SECONDS", "2"))
+
+# Index type (flat, ivf, hnsw, ivfpq) and its search-time recall/latency knobs
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat").lower()
+INDEX_NPROBE = int(os.getenv("INDEX_NPROBE", "16"))
+INDEX_EF_SEARCH = int(os.getenv("INDEX_EF_SEARCH", "64"))
+
+# Number of products returned by a search
+SEARCH_RESULTS = 3
+
+# SEARCH_MODE=hybrid fuses the FAISS results with a BM25 search of product titles
+# and categories by weighted reciprocal rank fusion, each side contributing its
+# best HYBRID_CANDIDATES products (see hybrid_search.py to benchmark the weights)
+SEARCH_MODE = os.getenv("SEARCH_MODE", "semantic").lower()
+HYBRID_SEMANTIC_WEIGHT = float(os.getenv("HYBRID_SEMANTIC_WEIGHT", "1.0"))
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+
+# Concurrent search queries are encoded together: at most BATCH_MAX_SIZE queries,
+# waiting at most BATCH_MAX_WAIT_MS for the batch to fill up
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+
+# Caches for repeated queries: normalized query -> embedding, and
+# (normalized query, filters, index version) -> formatted response
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "10000"))
+SEARCH_RESULT_CACHE_SIZE = int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "5000"))
+SEARCH_RESULT_CACHE_TTL = float(os.getenv("SEARCH_RESULT_CACHE_TTL", "300"))
+query_embedding_cache = LRUCache(QUERY_EMBEDDING_CACHE_SIZE)
+search_result_cache = LRUCache(SEARCH_RESULT_CACHE_SIZE, ttl=SEARCH_RESULT_CACHE_TTL)
+
+# FAISS index for fast similarity search, created by load_search_index()
+# Vectors are stored under stable int64 ids so single products can be updated or removed
+index = None
+active_index_type = None
+product_ids = {}  # FAISS id -> product ID for every embedding in the index
+faiss_ids = {}  # Product ID -> FAISS id, used to replace or remove a product's embedding
+next_faiss_id = 0  # Next unused FAISS id
+index_watermark = None  # Latest `updatedAt` seen by the last index update
+index_watermark_ids = set()  # Product IDs indexed with `updatedAt` equal to the watermark
+index_version = 0  # Bumped on every index update, so cached search results go stale
+catalog = CatalogSnapshot()  # Parsed fields of every indexed product by FAISS id, for filtering and display
+# BM25 index of titles and categories by FAISS id, for hybrid search. Removed and
+# replaced products stay in it until the next rebuild; the catalog's mask hides them
+lexical_index = InvertedIndex()
+index_generation = None  # Saved version of the index that is loaded, if any
+index_mapped = False  # Whether the loaded index and catalog are read-only memory maps
+index_meta_mtime = None  # Modification time of the metadata file when it was loaded
+_index_checked_at = 0.0
+
+# SEMANTIC_ROUTING=1 routes chatbot messages by embedding similarity to per-route
+# centroids, falling back to keywords below SEMANTIC_ROUTING_THRESHOLD. The message
+# embedding is cached, so product searches reuse it.
+SEMANTIC_ROUTING = os.getenv("SEMANTIC_ROUTING", "0") == "1"
+SEMANTIC_ROUTING_THRESHOLD = float(os.getenv("SEMANTIC_ROUTING_THRESHOLD", "0.4"))
+semantic_router = None
+
+# Translations are kept on disk, so canned responses are only translated once
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", os.path.join(INDEX_DIR, "translations.sqlite3"))
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "50000"))
+TRANSLATION_PREWARM = os.getenv("TRANSLATION_PREWARM", "1") == "1"
+# Characters sent per outbound translation request
+TRANSLATION_BATCH_CHARS = 4000
+
+ERROR_MESSAGE = 'Sorry, I encountered an error processing your request.'
+EMPTY_MESSAGE = 'Please provide a message.'
+
+# Responses sent verbatim, translated ahead of time into every supported language
+CANNED_RESPONSES = [*faq_answers.values(), *fashion_advice_responses.values(),
+                    GENERAL_FALLBACK, ERROR_MESSAGE, EMPTY_MESSAGE]
 
 # Supported languages and their default welcome messages
 SUPPORTED_LANGUAGES = {
@@ -68,60 +161,458 @@ SUPPORTED_LANGUAGES = {
     'pt': 'Olá! 👋 Como posso ajudá-lo hoje?'
 }
 
-# Function to initialize or update the FAISS index
-def update_faiss_index():
-    global index, product_ids
-    index = faiss.IndexFlatL2(embedding_size)
-    product_ids = []
-    
-    # Get all products from MongoDB
-    all_products = list(products_collection.find())
-    
-    if not all_products:
-        print("No products found in the database.")
-        return
+# Load the sentence encoder on first use
+def get_model():
+    global model, embedding_size, embedding_store
+    if model is None:
+        with _load_lock:
+            if model is None:
+                loaded = load_encoder(ENCODER_BACKEND, MODEL_NAME, ENCODER_MODEL_PATH)
+                embedding_size = loaded.get_sentence_embedding_dimension()
+                # Embeddings are cached on disk by a hash of the product text, so restarts
+                # only encode products that are new or whose text changed
+                embedding_store = EmbeddingStore(os.path.join(INDEX_DIR, "embeddings"),
+                                                 f"{MODEL_NAME}:{ENCODER_BACKEND}", embedding_size)
+                model = loaded
+    return model
+
+# Build the semantic router on first use (needs the sentence encoder)
+def get_semantic_router():
+    global semantic_router
+    if semantic_router is None:
+        encoder = get_model()
+        with _load_lock:
+            if semantic_router is None:
+                semantic_router = SemanticRouter(encoder.encode, threshold=SEMANTIC_ROUTING_THRESHOLD)
+    return semantic_router
+
+# Create the translator on first use
+def get_translator():
+    global translator
+    if translator is None:
+        with _load_lock:
+            if translator is None:
+                translator = Translator()
+    return translator
+
+# Build the text representation of a product that gets embedded
+def build_product_text(product):
+    # Safely access fields with .get() to provide defaults for missing fields
+    title = product.get('title', 'Unknown Product')
+    category = product.get('category', 'Uncategorized')
+    review = product.get('review', '')
+    price = product.get('price', '0')
     
-    # Create product texts for embedding
+    # Create a rich text representation of the product
+    return f"{title} {category} {review} price: {price}"
+
+# Text of a product indexed for lexical (BM25) search
+def lexical_text(title, category):
+    return f"{title} {category}"
+
+# Rebuild the lexical index from the catalog snapshot, e.g. after loading a saved index
+def build_lexical_index(snapshot):
+    rebuilt = InvertedIndex()
+    for faiss_id in np.flatnonzero(snapshot.valid).tolist():
+        product = snapshot.product(faiss_id)
+        rebuilt.add(faiss_id, lexical_text(product['title'], product['category']))
+    return rebuilt
+
+# Encode products for the index, skipping the ones that cannot be embedded
+def encode_products(products):
+    """
+    Returns:
+        tuple: (indexed products, their product IDs, their embeddings, latest `updatedAt`,
+            IDs of the products updated at that time)
+    """
     product_texts = []
-    for product in all_products:
+    new_product_ids = []
+    indexed_products = []
+    watermark = None
+    watermark_ids = set()
+    for product in products:
         try:
-            # Safely access fields with .get() to provide defaults for missing fields
-            title = product.get('title', 'Unknown Product')
-            category = product.get('category', 'Uncategorized')
-            review = product.get('review', '')
-            price = product.get('price', '0')
-            
-            # Create a rich text representation of the product
-            text = f"{title} {category} {review} price: {price}"
-            product_texts.append(text)
-            product_ids.append(str(product['_id']))
+            product_texts.append(build_product_text(product))
+            new_product_ids.append(str(product['_id']))
+            indexed_products.append(product)
         except Exception as e:
             print(f"Error processing product {product.get('_id', 'unknown ID')}: {e}")
             continue
+        
+        # Advance the watermark used by incremental updates
+        updated_at = product.get('updatedAt')
+        if updated_at and (watermark is None or updated_at > watermark):
+            watermark, watermark_ids = updated_at, set()
+        if updated_at and updated_at == watermark:
+            watermark_ids.add(str(product['_id']))
     
     if not product_texts:
+        return [], [], np.empty((0, embedding_size), dtype='float32'), None, set()
+    
+    # Generate embeddings, reusing cached ones for unchanged texts
+    embeddings = embedding_store.encode(product_texts, get_model().encode)
+    return indexed_products, new_product_ids, embeddings, watermark, watermark_ids
+
+# Add encoded products to the live FAISS index under fresh ids (call with _search_lock held)
+def add_products_to_index(indexed_products, new_product_ids, embeddings, watermark, watermark_ids):
+    global next_faiss_id, index_watermark, index_watermark_ids
+    if watermark and (index_watermark is None or watermark > index_watermark):
+        index_watermark, index_watermark_ids = watermark, set(watermark_ids)
+    elif watermark and watermark == index_watermark:
+        index_watermark_ids |= watermark_ids
+    if not indexed_products:
+        return 0
+    
+    ids = np.arange(next_faiss_id, next_faiss_id + len(indexed_products), dtype='int64')
+    index.add_with_ids(embeddings, ids)
+    for faiss_id, product_id in zip(ids.tolist(), new_product_ids):
+        product_ids[faiss_id] = product_id
+        faiss_ids[product_id] = faiss_id
+    catalog.set(ids, indexed_products)
+    for faiss_id, product in zip(ids.tolist(), indexed_products):
+        lexical_index.add(faiss_id, lexical_text(product.get('title', ''), product.get('category', '')))
+    next_faiss_id += len(indexed_products)
+    return len(indexed_products)
+
+# Remove products from the live FAISS index by product ID (call with _search_lock held)
+def remove_products_from_index(removed_product_ids):
+    ids = [faiss_ids.pop(product_id) for product_id in removed_product_ids if product_id in faiss_ids]
+    if not ids:
+        return 0
+    
+    index.remove_ids(np.array(ids, dtype='int64'))
+    catalog.remove(ids)
+    for faiss_id in ids:
+        del product_ids[faiss_id]
+    return len(ids)
+
+# Function to initialize or update the FAISS index
+def update_faiss_index(incremental=False):
+    """
+    Rebuild the FAISS index, or bring it up to date with the products collection
+    
+    Args:
+        incremental (bool): Only re-encode products added, changed or deleted since
+            the last update instead of rebuilding the whole index
+        
+    Returns:
+        dict: Summary of the update (mode, added, updated, removed, total)
+    """
+    global index_version
+    get_model()
+    with _index_lock, shared_index_lock():
+        # Shared indexes are updated on a private, writable copy of the latest saved version
+        if SHARED_INDEX:
+            load_index_state()
+        
+        if incremental and index_watermark is not None:
+            summary = update_faiss_index_incremental()
+        else:
+            summary = rebuild_faiss_index()
+        index_version += 1
+        search_ready.set()
+        
+        # Products changed, rebuild the availability index too once it's in use
+        if availability_index.signature is not None:
+            try:
+                availability_index.refresh(force=True)
+            except Exception as e:
+                print(f"Error refreshing availability index: {e}")
+        
+        try:
+            save_index_state()
+            if SHARED_INDEX:
+                # Swap the private copy for the shared memory-mapped one
+                load_index_state(mmap=True)
+        except Exception as e:
+            print(f"Error saving FAISS index: {e}")
+    return summary
+
+# Rebuild the FAISS index from every product in MongoDB
+def rebuild_faiss_index():
+    global index, active_index_type, product_ids, faiss_ids, next_faiss_id, index_watermark, index_watermark_ids
+    global catalog, lexical_index
+    # Get all products from MongoDB
+    all_products = list(products_collection().find())
+    if not all_products:
+        print("No products found in the database.")
+    
+    # Build the new index, catalog and id maps aside, searches keep using the
+    # current ones until they are swapped in together
+    indexed_products, new_product_ids, embeddings, watermark, watermark_ids = encode_products(all_products)
+    if indexed_products:
+        # IVF/PQ indexes are trained on the catalog
+        new_index, new_index_type = create_index(INDEX_TYPE, embedding_size, embeddings)
+    else:
+        new_index, new_index_type = create_index('flat', embedding_size, [])
+    ids = np.arange(len(indexed_products), dtype='int64')
+    new_catalog = CatalogSnapshot()
+    new_lexical_index = InvertedIndex()
+    if indexed_products:
+        new_index.add_with_ids(embeddings, ids)
+        new_catalog.set(ids, indexed_products)
+        for faiss_id, product in zip(ids.tolist(), indexed_products):
+            new_lexical_index.add(faiss_id, lexical_text(product.get('title', ''), product.get('category', '')))
+    new_ids = dict(zip(ids.tolist(), new_product_ids))
+    
+    with _search_lock:
+        (index, active_index_type, catalog, lexical_index, product_ids, faiss_ids, next_faiss_id,
+         index_watermark, index_watermark_ids) = (new_index, new_index_type, new_catalog, new_lexical_index, new_ids,
+                                                  {product_id: faiss_id for faiss_id, product_id in new_ids.items()},
+                                                  len(indexed_products), watermark, watermark_ids)
+    
+    added = len(indexed_products)
+    if not all_products:
+        return {'mode': 'full', 'added': 0, 'updated': 0, 'removed': 0, 'total': 0}
+    if not added:
         print("No valid products to index after filtering.")
+    else:
+        print(f"FAISS index ({active_index_type}) updated with {added} products")
+    
+    # Forget cached embeddings of products that changed or no longer exist
+    stale = embedding_store.compact([build_product_text(product) for product in all_products])
+    if stale:
+        print(f"Dropped {stale} stale cached embeddings")
+    return {'mode': 'full', 'added': added, 'updated': 0, 'removed': 0, 'total': added}
+
+# Re-encode only the products that changed since the last index update
+def update_faiss_index_incremental():
+    # Deleted documents leave no trace behind, so compare the (index-covered) set of ids
+    current_ids = {str(doc['_id']) for doc in products_collection().find({}, {'_id': 1})}
+    deleted_ids = [product_id for product_id in faiss_ids if product_id not in current_ids]
+    unindexed_ids = [ObjectId(product_id) for product_id in current_ids if product_id not in faiss_ids]
+    
+    # Products touched after the watermark, or at it but not indexed then (many
+    # products can share one timestamp), plus any that were never indexed
+    # (e.g. documents written without timestamps)
+    changed_products = list(products_collection().find({'$or': [
+        {'updatedAt': {'$gt': index_watermark}},
+        {'updatedAt': index_watermark, '_id': {'$nin': [ObjectId(product_id) for product_id in index_watermark_ids]}},
+        {'_id': {'$in': unindexed_ids}},
+    ]}))
+    
+    # HNSW graphs cannot drop vectors, so deletions and edits mean a rebuild
+    # (cheap, since unchanged embeddings come from the cache)
+    if not supports_removal(active_index_type) and (
+            deleted_ids or any(str(product['_id']) in faiss_ids for product in changed_products)):
+        print(f"{active_index_type} index cannot remove products, rebuilding")
+        return rebuild_faiss_index()
+    
+    # Encode first, then apply the whole change while no search is running
+    encoded = encode_products(changed_products)
+    with _search_lock:
+        removed = remove_products_from_index(deleted_ids)
+        updated = remove_products_from_index([str(product['_id']) for product in changed_products])
+        added = add_products_to_index(*encoded) - updated
+    print(f"FAISS index incrementally updated: {added} added, {updated} updated, {removed} removed, {len(product_ids)} total")
+    return {'mode': 'incremental', 'added': added, 'updated': updated, 'removed': removed, 'total': len(product_ids)}
+
+# Hold the inter-process index lock (only needed when workers share the index)
+@contextmanager
+def shared_index_lock():
+    if not SHARED_INDEX:
+        yield
         return
     
-    # Generate embeddings
-    embeddings = model.encode(product_texts)
+    import fcntl
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    with open(INDEX_LOCK_PATH, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# Persist the FAISS index, catalog snapshot and id mapping so restarts can skip the full rebuild
+def save_index_state():
+    global index_generation
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    
+    # Each save writes a new generation of files; the metadata file, replaced
+    # atomically once everything is written, names the current generation
+    generation = str(time.time_ns())
+    faiss.write_index(index, os.path.join(INDEX_DIR, f"products_{generation}.faiss"))
+    catalog.save(os.path.join(INDEX_DIR, f"catalog_{generation}"))
+    meta = {
+        'generation': generation,
+        'index_type': INDEX_TYPE,
+        'active_index_type': active_index_type,
+        'product_ids': product_ids,
+        'next_faiss_id': next_faiss_id,
+        'watermark': index_watermark.isoformat() if index_watermark else None,
+        'watermark_ids': sorted(index_watermark_ids),
+    }
+    with open(INDEX_META_PATH + ".tmp", 'w') as f:
+        json.dump(meta, f)
+    os.replace(INDEX_META_PATH + ".tmp", INDEX_META_PATH)
+    index_generation = generation
     
-    # Add to FAISS index
-    index.add(np.array(embeddings).astype('float32'))
-    print(f"FAISS index updated with {len(product_ids)} products")
+    # Processes still mapping an older generation keep it readable until they reload
+    for name in os.listdir(INDEX_DIR):
+        is_generation = (name.startswith('products_') and name.endswith('.faiss')) or name.startswith('catalog_')
+        if is_generation and generation not in name:
+            path = os.path.join(INDEX_DIR, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
 
-# Initialize FAISS index on startup
-try:
-    update_faiss_index()
-except Exception as e:
-    print(f"Error initializing FAISS index: {e}")
+# Load the saved FAISS index, returns False if there is none to load
+def load_index_state(mmap=False):
+    """
+    Args:
+        mmap (bool): Memory-map the index and catalog snapshot read-only, so all
+            processes loading them share one copy. FAISS maps the inverted lists of
+            IVF indexes; flat and HNSW indexes are read into memory.
+    """
+    global index, active_index_type, product_ids, faiss_ids, next_faiss_id, index_watermark, index_watermark_ids
+    global catalog, index_generation, index_mapped, index_meta_mtime, lexical_index
+    if not os.path.exists(INDEX_META_PATH):
+        return False
+    
+    meta_mtime = os.stat(INDEX_META_PATH).st_mtime_ns
+    with open(INDEX_META_PATH) as f:
+        meta = json.load(f)
+    generation = meta.get('generation')
+    if not generation:
+        return False
+    
+    io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+    loaded_index = faiss.read_index(os.path.join(INDEX_DIR, f"products_{generation}.faiss"), io_flags)
+    if loaded_index.d != embedding_size or loaded_index.ntotal != len(meta['product_ids']):
+        print("Saved FAISS index does not match the current model, rebuilding")
+        return False
+    if meta.get('index_type') != INDEX_TYPE:
+        print(f"Saved FAISS index is not of type {INDEX_TYPE}, rebuilding")
+        return False
+    
+    loaded_catalog = CatalogSnapshot.load(os.path.join(INDEX_DIR, f"catalog_{generation}"), mmap=mmap)
+    loaded_lexical_index = build_lexical_index(loaded_catalog)
+    loaded_ids = {int(faiss_id): product_id for faiss_id, product_id in meta['product_ids'].items()}
+    with _search_lock:
+        (index, active_index_type, catalog, lexical_index, product_ids, faiss_ids, next_faiss_id,
+         index_watermark, index_watermark_ids) = (loaded_index, meta['active_index_type'], loaded_catalog,
+                                                  loaded_lexical_index, loaded_ids,
+                                                  {product_id: faiss_id for faiss_id, product_id in loaded_ids.items()},
+                                                  meta['next_faiss_id'],
+                                                  datetime.fromisoformat(meta['watermark']) if meta['watermark'] else None,
+                                                  set(meta.get('watermark_ids', [])))
+    index_generation = generation
+    index_mapped = mmap
+    index_meta_mtime = meta_mtime
+    print(f"Loaded FAISS index with {len(product_ids)} products (generation {generation}{', mapped' if mmap else ''})")
+    return True
+
+# Pick up an index saved by another worker process
+def refresh_shared_index():
+    global index_version, _index_checked_at
+    if not SHARED_INDEX or time.monotonic() - _index_checked_at < SHARED_INDEX_CHECK_SECONDS:
+        return
+    _index_checked_at = time.monotonic()
+    
+    try:
+        if os.stat(INDEX_META_PATH).st_mtime_ns == index_meta_mtime:
+            return
+        # Requests don't wait for an update running in this process, it loads
+        # the index it saves itself
+        if not _index_lock.acquire(blocking=False):
+            return
+        try:
+            if load_index_state(mmap=True):
+                index_version += 1
+        finally:
+            _index_lock.release()
+    except Exception as e:
+        print(f"Error reloading shared FAISS index: {e}")
+
+# Load the FAISS index, catching up from the saved index when there is one
+def load_search_index():
+    get_model()
+    if SHARED_INDEX:
+        # update_faiss_index() starts from the latest saved index in shared mode
+        update_faiss_index(incremental=True)
+        return
+    
+    try:
+        index_loaded = load_index_state()
+    except Exception as e:
+        print(f"Error loading saved FAISS index: {e}")
+        index_loaded = False
+    update_faiss_index(incremental=index_loaded)
+
+# Load everything the search path needs, then mark the app ready
+def warm_up():
+    global warmup_error
+    try:
+        # Test the connection
+        products_count = products_collection().count_documents({})
+        print(f"Connected to MongoDB, products count: {products_count}")
+        if products_count == 0:
+            print("Warning: No products found in the collection!")
+    except Exception as e:
+        print(f"MongoDB connection error: {e}")
+    
+    try:
+        get_translator()
+        load_search_index()
+        faq_store.build_index(get_model().encode)
+        # Match near-duplicate Gemini queries by their (cached) query embedding
+        gemini_response_cache.embed_fn = lambda query: encode_queries([query])[0]
+        if SEMANTIC_ROUTING:
+            get_semantic_router()
+        print("Search path is warm")
+    except Exception as e:
+        warmup_error = str(e)
+        print(f"Error initializing FAISS index: {e}")
+    
+    if TRANSLATION_PREWARM:
+        prewarm_translations()
+
+# Run warm_up() once, in a background thread
+_warmup_thread = None
+def start_warm_up():
+    global _warmup_thread
+    with _load_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warm_up, name='warm-up', daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+# Ask the translator for the language of a message the local identifier can't place
+def translator_language(text):
+    language = get_translator().detect(text).lang.lower()
+    return language if language in SUPPORTED_LANGUAGES else 'en'
+
+# Local, deterministic language identification over the supported languages, with
+# the translator deciding short messages without clear evidence ("Camisa azul")
+language_identifier = LanguageIdentifier(SUPPORTED_LANGUAGES, default='en', fallback=translator_language)
 
 # Function to detect language
 def detect_language(text):
-    try:
-        return detect(text)
-    except LangDetectException:
-        return 'en'  # Default to English if detection fails
+    return language_identifier.detect(text)
+
+# Translate texts with as few outbound requests as possible
+def translate_batch(texts, source_lang, target_lang):
+    translator = get_translator()
+    translated = []
+    start = 0
+    while start < len(texts):
+        # Send lines together as one text, up to TRANSLATION_BATCH_CHARS at a time
+        end = start + 1
+        size = len(texts[start])
+        while end < len(texts) and size + len(texts[end]) + 1 <= TRANSLATION_BATCH_CHARS:
+            size += len(texts[end]) + 1
+            end += 1
+        chunk = texts[start:end]
+        lines = translator.translate('\n'.join(chunk), src=source_lang, dest=target_lang).text.split('\n')
+        if len(lines) != len(chunk):
+            # Lines were merged or split by the translation, translate them one by one
+            lines = [translation.text for translation in translator.translate(chunk, src=source_lang, dest=target_lang)]
+        translated.extend(lines)
+        start = end
+    return translated
+
+translation_cache = CachedTranslator(translate_batch, TranslationMemory(TRANSLATION_CACHE_PATH, TRANSLATION_CACHE_SIZE))
 
 # Function to translate text
 def translate_text(text, source_lang, target_lang='en'):
@@ -129,14 +620,58 @@ def translate_text(text, source_lang, target_lang='en'):
         return text
     
     try:
-        translation = translator.translate(text, src=source_lang, dest=target_lang)
-        return translation.text
+        return translation_cache.translate(text, source_lang, target_lang)
     except Exception as e:
         print(f"Translation error: {e}")
         return text  # Return original text if translation fails
 
+# Translate the canned responses into every supported language ahead of time
+def prewarm_translations():
+    for lang in SUPPORTED_LANGUAGES:
+        if lang == 'en':
+            continue
+        try:
+            translation_cache.translate_many(CANNED_RESPONSES, 'en', lang)
+        except Exception as e:
+            print(f"Error translating canned responses to {lang}: {e}")
+
+# Normalize a language code, e.g. 'zh-CN' -> 'zh'
+def normalize_language(lang):
+    return lang.lower().split('-')[0] if '-' in lang else lang.lower()
+
+# Pick the handler for an English message:
+# 'availability', 'product_search', 'fashion_advice', 'faq' or 'general'
+def classify_message(english_message):
+    # Route by meaning once the encoder is loaded, when enabled and confident
+    if SEMANTIC_ROUTING and semantic_router is not None:
+        route, _ = semantic_router.route(encode_queries([normalize_query(english_message)])[0])
+        if route:
+            return route
+    
+    matches = analyze(english_message)
+    for route in ('availability', 'product_search', 'fashion_advice', 'faq'):
+        if matches.has(route):
+            return route
+    # Try to find the best matching response
+    if matches.has('search_fallback'):
+        return 'product_search'
+    return 'general'
+
+# Answer an English message with the handler picked by classify_message()
+def answer_message(english_message, route):
+    if route == 'availability':
+        return check_product_availability(english_message)
+    if route == 'product_search':
+        return handle_product_search(english_message)
+    if route == 'faq':
+        # Match FAQs by meaning once their questions are embedded
+        if faq_store.indexed:
+            return get_faq_answer(english_message, encode_queries([normalize_query(english_message)])[0])
+        return get_faq_answer(english_message)
+    return get_gemini_response(english_message, route)
+
 # Define API routes
-@app.route('/api/chatbot', methods=['POST'])
+@api.route('/api/chatbot', methods=['POST'])
 def chatbot():
     try:
         data = request.json
@@ -144,32 +679,16 @@ def chatbot():
         client_lang = data.get('language', None)
         
         if not user_message:
-            return jsonify({'response': 'Please provide a message.', 'language': 'en'})
+            return jsonify({'response': EMPTY_MESSAGE, 'language': 'en'})
         
         # Detect message language if not provided by client
-        detected_lang = client_lang or detect_language(user_message)
-        
-        # Normalize language code
-        detected_lang = detected_lang.lower().split('-')[0] if '-' in detected_lang else detected_lang.lower()
+        detected_lang = normalize_language(client_lang or detect_language(user_message))
         
         # Translate to English for processing
         english_message = translate_text(user_message, detected_lang, 'en')
         
         # Process the translated message
-        if is_availability_check(english_message):
-            english_response = check_product_availability(english_message)
-        elif is_product_search(english_message):
-            english_response = handle_product_search(english_message)
-        elif is_fashion_advice(english_message):
-            english_response = get_gemini_response(english_message, "fashion_advice")
-        elif is_faq(english_message):
-            english_response = get_faq_answer(english_message)
-        else:
-            # Try to find the best matching response
-            if "product" in english_message.lower() or "find" in english_message.lower() or "search" in english_message.lower():
-                english_response = handle_product_search(english_message)
-            else:
-                english_response = get_gemini_response(english_message, "general")
+        english_response = answer_message(english_message, classify_message(english_message))
         
         # Translate response back to detected language
         if detected_lang != 'en' and detected_lang in SUPPORTED_LANGUAGES:
@@ -180,7 +699,7 @@ def chatbot():
         return jsonify({'response': response, 'language': detected_lang})
     except Exception as e:
         print(f"Error in chatbot endpoint: {e}")
-        error_message = 'Sorry, I encountered an error processing your request.'
+        error_message = ERROR_MESSAGE
         
         # Try to translate the error message
         try:
@@ -191,13 +710,55 @@ def chatbot():
             
         return jsonify({'response': error_message, 'language': client_lang or 'en'})
 
+# Format one server-sent event
+def sse_event(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# Chatbot endpoint streaming the response as server-sent events: `data: {"text": ...}`
+# events with the response in order, then a `done` event with the language
+@api.route('/api/chatbot/stream', methods=['POST'])
+def chatbot_stream():
+    data = request.json or {}
+    user_message = data.get('message', '').strip()
+    client_lang = data.get('language', None)
+    
+    def events():
+        if not user_message:
+            yield sse_event({'text': EMPTY_MESSAGE})
+            yield sse_event({'language': 'en'}, event='done')
+            return
+        
+        detected_lang = 'en'
+        try:
+            detected_lang = normalize_language(client_lang or detect_language(user_message))
+            reply_lang = detected_lang if detected_lang in SUPPORTED_LANGUAGES else 'en'
+            english_message = translate_text(user_message, detected_lang, 'en')
+            route = classify_message(english_message)
+            
+            if route in ('fashion_advice', 'general'):
+                # Gemini answers in the user's language, so chunks are forwarded as they arrive
+                for chunk in stream_gemini_response(english_message, route, reply_lang,
+                                                    localize=lambda text: translate_text(text, 'en', reply_lang)):
+                    yield sse_event({'text': chunk})
+            else:
+                yield sse_event({'text': translate_text(answer_message(english_message, route), 'en', reply_lang)})
+        except Exception as e:
+            print(f"Error in chatbot stream: {e}")
+            error_lang = detected_lang if detected_lang in SUPPORTED_LANGUAGES else 'en'
+            yield sse_event({'text': translate_text(ERROR_MESSAGE, 'en', error_lang)})
+        yield sse_event({'language': detected_lang}, event='done')
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 # New endpoint to get welcome message in specified language
-@app.route('/api/get-welcome-message', methods=['GET'])
+@api.route('/api/get-welcome-message', methods=['GET'])
 def get_welcome_message():
     lang = request.args.get('language', 'en')
     
     # Normalize language code
-    lang = lang.lower().split('-')[0] if '-' in lang else lang.lower()
+    lang = normalize_language(lang)
     
     # Get welcome message for the specified language or default to English
     welcome_message = SUPPORTED_LANGUAGES.get(lang, SUPPORTED_LANGUAGES['en'])
@@ -209,43 +770,104 @@ def get_welcome_message():
     })
 
 # New endpoint to get all supported languages
-@app.route('/api/supported-languages', methods=['GET'])
+@api.route('/api/supported-languages', methods=['GET'])
 def supported_languages():
     return jsonify({
         'languages': list(SUPPORTED_LANGUAGES.keys())
     })
 
 # Route to manually trigger FAISS index update
-@app.route('/api/update-index', methods=['POST'])
+@api.route('/api/update-index', methods=['POST'])
 def update_index():
     try:
-        update_faiss_index()
-        return jsonify({'status': 'success', 'message': 'Product index updated successfully'})
+        data = request.get_json(silent=True) or {}
+        incremental = request.args.get('mode') == 'incremental' or bool(data.get('incremental'))
+        summary = update_faiss_index(incremental=incremental)
+        return jsonify({'status': 'success', 'message': 'Product index updated successfully', **summary})
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Error updating index: {str(e)}'})
 
+# Readiness probe: 200 once the model and index are loaded, 503 while warming up
+@api.route('/api/ready', methods=['GET'])
+def ready():
+    status = {
+        'ready': search_ready.is_set(),
+        'modelLoaded': model is not None,
+        'translatorLoaded': translator is not None,
+        'indexedProducts': len(product_ids),
+        'error': warmup_error
+    }
+    return jsonify(status), 200 if status['ready'] else 503
+
+# Route exposing performance counters of the search path
+@api.route('/api/metrics', methods=['GET'])
+def metrics():
+    return jsonify({
+        'searchBatching': search_batcher.stats(),
+        'queryEmbeddingCache': query_embedding_cache.stats(),
+        'searchResultCache': search_result_cache.stats(),
+        'translationCache': translation_cache.stats(),
+        'languageIdCache': language_identifier.cache.stats(),
+        'geminiResponseCache': gemini_response_cache.stats(),
+        'geminiStreaming': stream_metrics.stats(),
+        'geminiCalls': gemini_stats(),
+        'mongoPool': pool_metrics.stats(),
+        'searchMode': SEARCH_MODE,
+        'indexVersion': index_version,
+        'indexGeneration': index_generation,
+        'indexMapped': index_mapped
+    })
+
+# Route to compare the recall and latency of each index type against exact search
+@api.route('/api/index-report', methods=['POST'])
+def index_report():
+    try:
+        data = request.get_json(silent=True) or {}
+        k = int(data.get('k', 10))
+        get_model()
+        vectors = np.asarray(embedding_store.vectors, dtype='float32')
+        if len(vectors) == 0:
+            return jsonify({'status': 'error', 'message': 'No product embeddings to benchmark'})
+        
+        # Benchmark with the given queries, or with a sample of catalog embeddings
+        if data.get('queries'):
+            queries = np.array(get_model().encode(data['queries'])).astype('float32')
+        else:
+            rng = np.random.default_rng(0)
+            queries = vectors[rng.choice(len(vectors), size=min(100, len(vectors)), replace=False)]
+        
+        report = recall_latency_report(vectors, queries, k=k)
+        return jsonify({
+            'status': 'success',
+            'products': len(vectors),
+            'queries': len(queries),
+            'k': k,
+            'activeIndexType': active_index_type,
+            'report': report
+        })
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error building index report: {str(e)}'})
+
 # Helper functions for intent detection
 def is_product_search(message):
-    product_keywords = ['find', 'search', 'looking for', 'show me', 'product', 'buy']
-    return any(keyword in message.lower() for keyword in product_keywords)
+    return analyze(message).has('product_search')
 
 def is_fashion_advice(message):
-    fashion_keywords = ['wear', 'outfit', 'fashion', 'style', 'trend', 'dress', 'match', 'fashionable', 'stylish']
-    return any(keyword in message.lower() for keyword in fashion_keywords)
+    return analyze(message).has('fashion_advice')
 
 def is_faq(message):
-    faq_keywords = ['policy', 'shipping', 'return', 'delivery', 'payment', 'track', 'order', 'how do i', 'how to']
-    return any(keyword in message.lower() for keyword in faq_keywords)
+    return analyze(message).has('faq')
 
 def is_availability_check(message):
-    availability_keywords = ['available', 'in stock', 'do you have', 'do you sell', 'availability']
-    return any(keyword in message.lower() for keyword in availability_keywords)
+    return analyze(message).has('availability')
 
 # Product search handler
 def handle_product_search(query):
     try:
-        # If FAISS index is empty, return appropriate message
-        if len(product_ids) == 0:
+        refresh_shared_index()
+        
+        # If FAISS index is still loading or empty, return appropriate message
+        if not search_ready.is_set() or len(product_ids) == 0:
             return "Sorry, our product database is currently empty or being updated. Please try again later."
             
         # Extract price constraints if any
@@ -260,87 +882,103 @@ def handle_product_search(query):
         # Extract categories if any
         category = extract_category(query)
         
-        # Create embedding for the query
-        query_embedding = model.encode([query])
-        
-        # Search similar products using FAISS
-        k = 5  # Number of results to return
-        distances, indices = index.search(np.array(query_embedding).astype('float32'), k)
+        # Repeated queries against the same index are answered from the cache
+        constraints = (max_price, min_rating, category, good_reviews)
+        cache_key = (normalize_query(query), constraints, index_version)
+        cached_response = search_result_cache.get(cache_key)
+        if cached_response is not None:
+            return cached_response
         
-        # Get matching product IDs
-        matching_product_ids = [product_ids[idx] for idx in indices[0]]
-        
-        # Retrieve products from MongoDB
-        from bson.objectid import ObjectId
-        matching_products = list(products_collection.find({
-            '_id': {'$in': [ObjectId(pid) for pid in matching_product_ids]}
-        }))
-        
-        # Apply filters
-        filtered_products = []
-        for product in matching_products:
-            # Handle price filtering with safe price extraction
-            try:
-                price_str = product.get('price', '0')
-                if isinstance(price_str, str):
-                    # Remove currency symbol and commas
-                    price_str = price_str.replace('₹', '').replace(',', '')
-                    price_value = float(price_str)
-                else:
-                    price_value = float(price_str)
-                    
-                if max_price and price_value > max_price:
-                    continue
-            except (ValueError, TypeError):
-                # If price can't be parsed, skip price filtering
-                pass
-                
-            # Handle rating filtering
-            try:
-                rating = product.get('rating', 0)
-                if min_rating and rating < min_rating:
-                    continue
-            except (ValueError, TypeError):
-                pass
-                
-            # Handle review filtering
-            try:
-                reviews = product.get('reviews', '')
-                if good_reviews and 'good' not in reviews.lower():
-                    continue
-            except (ValueError, TypeError):
-                pass
-                
-            # Handle category filtering with safe category extraction
-            product_category = product.get('category', '').lower()
-            if category and category.lower() not in product_category:
-                continue
-                
-            filtered_products.append(product)
+        # Encode and search together with any concurrent queries, restricted to
+        # the products matching every constraint
+        filtered_products = search_batcher((query, constraints))
         
         # Format response
         if filtered_products:
             response = "I found the following products for you:\n\n"
-            for i, product in enumerate(filtered_products[:3], 1):  # Limit to top 3
-                # Safely get product attributes
-                title = product.get('title', 'Unnamed Product')
-                price = product.get('price', 'N/A')
-                category = product.get('category', 'Uncategorized')
-                rating = product.get('rating', 'No rating')
-                
-                # Format with proper currency symbol if not already present
-                if isinstance(price, str) and '₹' not in price:
-                    price = f"₹{price}"
-                
-                response += f"{i}. {title} - {price}\n   Category: {category}\n   Rating: {rating}\n\n"
+            for i, product in enumerate(filtered_products, 1):
+                response += f"{i}. {product['title']} - {product['price']}\n   Category: {product['category']}\n   Rating: {product['rating']}\n\n"
         else:
             response = "I couldn't find any products matching your criteria. Could you try a different search?"
         
+        search_result_cache.set(cache_key, response)
         return response
     except Exception as e:
         print(f"Error in product search: {e}")
         return "Sorry, I encountered an error while searching for products. Please try again."
 
+# Encode a batch of search queries in one forward pass and search them together
+def search_products_batch(requests):
+    """
+    Args:
+        requests (list): (query, constraints) pairs, where constraints is the
+            (max_price, min_rating, category, good_reviews) tuple of the query
+        
+    Returns:
+        list: Display fields of the matching products for each request, nearest first
+    """
+    embeddings = encode_queries([normalize_query(query) for query, _ in requests])
+    
+    # Queries with the same constraints share one allowed mask and one FAISS call
+    groups = {}
+    for position, (_, constraints) in enumerate(requests):
+        groups.setdefault(constraints, []).append(position)
+    
+    # Index updates wait for the batch, so the ids found are read from the same catalog
+    with _search_lock:
+        return search_groups(requests, embeddings, groups)
+
+# Search each group of requests sharing constraints (call with _search_lock held)
+def search_groups(requests, embeddings, groups):
+    hybrid = SEARCH_MODE == 'hybrid'
+    results = [None] * len(requests)
+    for constraints, positions in groups.items():
+        allowed = catalog.allowed_mask(*constraints)
+        if hybrid:
+            # BM25 runs on another thread while FAISS (which releases the GIL) searches
+            lexical = lexical_executor.submit(search_lexical, [requests[position][0] for position in positions], allowed)
+        found = filtered_search(index, active_index_type, embeddings[positions], allowed,
+                                HYBRID_CANDIDATES if hybrid else SEARCH_RESULTS, INDEX_NPROBE, INDEX_EF_SEARCH)
+        if hybrid:
+            weights = (HYBRID_SEMANTIC_WEIGHT, HYBRID_LEXICAL_WEIGHT)
+            found = [reciprocal_rank_fusion([semantic_ids, lexical_ids], weights, HYBRID_RRF_K, SEARCH_RESULTS)
+                     for semantic_ids, lexical_ids in zip(found, lexical.result())]
+        for position, ids in zip(positions, found):
+            # Read the matching products from the in-memory catalog snapshot
+            results[position] = [catalog.product(idx) for idx in ids if idx in product_ids]
+    return results
+
+# Best BM25 matches of each query's words in product titles and categories, among the allowed ids
+def search_lexical(queries, allowed):
+    if np.array_equal(allowed, catalog.valid):
+        # No constraints, the mask only hides removed products: rather than listing
+        # every allowed id, fetch enough extra matches to drop those afterwards
+        within = None
+        k = HYBRID_CANDIDATES + len(allowed) - int(np.count_nonzero(allowed))
+    else:
+        within = np.flatnonzero(allowed).tolist()
+        k = HYBRID_CANDIDATES
+    return [[faiss_id for faiss_id, _ in lexical_index.search(tokenize(query), k=k, mode='or', within=within)
+             if allowed[faiss_id]][:HYBRID_CANDIDATES]
+            for query in queries]
+
+lexical_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lexical-search')
+
+# Embeddings of normalized queries, shared by search and semantic routing
+def encode_queries(queries):
+    # Only encode queries whose embedding isn't cached yet
+    embeddings = [query_embedding_cache.get(query) for query in queries]
+    missing = list(dict.fromkeys(query for query, embedding in zip(queries, embeddings) if embedding is None))
+    if missing:
+        encoded = dict(zip(missing, np.array(get_model().encode(missing)).astype('float32')))
+        for query, embedding in encoded.items():
+            query_embedding_cache.set(query, embedding)
+        embeddings = [encoded[query] if embedding is None else embedding
+                      for query, embedding in zip(queries, embeddings)]
+    return np.stack(embeddings)
+
+search_batcher = MicroBatcher(search_products_batch, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, name='search-batcher')
+
 # Helper function to extract maximum price from query
 def extract_max_price(query):
     price_patterns = [
@@ -388,5 +1026,32 @@ def extract_category(query):
             return category
     return None
 
+# Application factory, e.g. `gunicorn 'app:create_app()'`
+def create_app(warm_up_in_background=True):
+    """
+    Create the Flask app
+    
+    Args:
+        warm_up_in_background (bool): Load the model and index in a background
+            thread (the app starts serving immediately and /api/ready reports 503
+            until they are loaded) instead of before returning
+        
+    With SHARED_INDEX=1, warm up before forking so workers share the model weights
+    and the mapped index pages, e.g.
+    `gunicorn --preload -w 4 'app:create_app(warm_up_in_background=False)'`
+        
+    Returns:
+        Flask: The app
+    """
+    app = Flask(__name__)
+    CORS(app)  # Enable CORS for all routes
+    app.register_blueprint(api)
+    
+    if warm_up_in_background:
+        start_warm_up()
+    else:
+        start_warm_up().join()
+    return app
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    create_app().run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,142 @@
+import asyncio
+import inspect
+import os
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart, request, jsonify
+from quart_cors import cors
+import app as backend
+from gemini_handler import get_gemini_response_async
+
+# Seconds each outbound call may take before the pipeline gives up on it
+TRANSLATE_TIMEOUT = float(os.getenv("TRANSLATE_TIMEOUT", "3"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "10"))
+LOCAL_HANDLER_TIMEOUT = float(os.getenv("LOCAL_HANDLER_TIMEOUT", "5"))
+
+# Threads running blocking calls (translation, MongoDB, FAISS) off the event loop
+BLOCKING_WORKERS = int(os.getenv("ASYNC_BLOCKING_WORKERS", "32"))
+
+
+class ChatPipeline:
+    """
+    The /api/chatbot pipeline with every outbound call awaited
+
+    Language detection, translation to English, routing, the answer and the
+    translation back run like in app.chatbot(), but Gemini calls are awaited on the
+    event loop and blocking calls run on a thread pool, each with its own timeout,
+    so one worker can keep many conversations in flight.
+
+    Args:
+        translate_fn: `(text, source_lang, target_lang) -> str`, plain or async,
+            app.translate_text by default
+        llm: Model with `generate_content_async(prompt)`, the Gemini model by default
+        translate_timeout (float): Seconds per translation, the untranslated text is
+            used after that
+        llm_timeout (float): Seconds per Gemini call, the local fallback answer is
+            used after that
+        handler_timeout (float): Seconds for a local handler (product search,
+            availability, FAQ)
+    """
+
+    def __init__(self, translate_fn=None, llm=None, translate_timeout=TRANSLATE_TIMEOUT,
+                 llm_timeout=LLM_TIMEOUT, handler_timeout=LOCAL_HANDLER_TIMEOUT, executor=None):
+        self.translate_fn = translate_fn or backend.translate_text
+        self.llm = llm
+        self.translate_timeout = translate_timeout
+        self.llm_timeout = llm_timeout
+        self.handler_timeout = handler_timeout
+        self.executor = executor or ThreadPoolExecutor(BLOCKING_WORKERS, thread_name_prefix='chat-blocking')
+
+    async def run_blocking(self, fn, *args, timeout=None):
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self.executor, fn, *args), timeout)
+
+    async def detect_language(self, text):
+        # Messages without clear evidence are sent to the translator to detect
+        try:
+            return await self.run_blocking(backend.detect_language, text, timeout=self.translate_timeout)
+        except asyncio.TimeoutError:
+            print(f"Language detection timed out after {self.translate_timeout}s")
+            return 'en'
+
+    async def translate(self, text, source_lang, target_lang='en'):
+        if source_lang == target_lang:
+            return text
+        try:
+            if inspect.iscoroutinefunction(self.translate_fn):
+                return await asyncio.wait_for(self.translate_fn(text, source_lang, target_lang), self.translate_timeout)
+            return await self.run_blocking(self.translate_fn, text, source_lang, target_lang,
+                                           timeout=self.translate_timeout)
+        except asyncio.TimeoutError:
+            print(f"Translation timed out after {self.translate_timeout}s")
+            return text
+        except Exception as e:
+            print(f"Translation error: {e}")
+            return text
+
+    async def answer(self, user_message, client_lang=None):
+        """
+        Returns:
+            tuple: (response in the user's language, language code)
+        """
+        detected_lang = backend.normalize_language(client_lang or await self.detect_language(user_message))
+
+        english_message = await self.translate(user_message, detected_lang, 'en')
+
+        # Semantic routing encodes the message, so it runs off the event loop too
+        route = await self.run_blocking(backend.classify_message, english_message, timeout=self.handler_timeout)
+        if route in ('fashion_advice', 'general'):
+            english_response = await get_gemini_response_async(english_message, route,
+                                                               timeout=self.llm_timeout, llm=self.llm)
+        else:
+            english_response = await self.run_blocking(backend.answer_message, english_message, route,
+                                                       timeout=self.handler_timeout)
+
+        if detected_lang != 'en' and detected_lang in backend.SUPPORTED_LANGUAGES:
+            return await self.translate(english_response, 'en', detected_lang), detected_lang
+        return english_response, detected_lang
+
+
+def create_asgi_app(pipeline=None, flask_app=None):
+    """
+    ASGI application serving /api/chatbot asynchronously
+
+    Every other route is passed through to the Flask app, e.g.
+    `hypercorn 'asgi_app:create_asgi_app()'`.
+
+    Args:
+        pipeline (ChatPipeline): Chatbot pipeline, a default one if not given
+        flask_app: WSGI app for the other routes, app.create_app() if not given
+    """
+    pipeline = pipeline or ChatPipeline()
+    chat_app = cors(Quart(__name__))
+
+    @chat_app.route('/api/chatbot', methods=['POST'])
+    async def chatbot():
+        client_lang = None
+        try:
+            data = await request.get_json()
+            user_message = data.get('message', '').strip()
+            client_lang = data.get('language', None)
+
+            if not user_message:
+                return jsonify({'response': backend.EMPTY_MESSAGE, 'language': 'en'})
+
+            response, language = await pipeline.answer(user_message, client_lang)
+            return jsonify({'response': response, 'language': language})
+        except Exception as e:
+            print(f"Error in chatbot endpoint: {e!r}")
+            error_message = backend.ERROR_MESSAGE
+            if client_lang and client_lang != 'en' and client_lang in backend.SUPPORTED_LANGUAGES:
+                error_message = await pipeline.translate(error_message, 'en', client_lang)
+            return jsonify({'response': error_message, 'language': client_lang or 'en'})
+
+    wsgi_app = WsgiToAsgi(flask_app or backend.create_app())
+
+    async def application(scope, receive, send):
+        if scope['type'] == 'lifespan' or scope.get('path') == '/api/chatbot':
+            await chat_app(scope, receive, send)
+        else:
+            await wsgi_app(scope, receive, send)
+
+    return application
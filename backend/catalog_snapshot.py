@@ -0,0 +1,194 @@
+import os
+import numpy as np
+
+
+def parse_price(price):
+    """Parse a stored price such as '₹1,299' or 1299 into a float (NaN if it can't be parsed)"""
+    try:
+        if isinstance(price, str):
+            # Remove currency symbol and commas
+            price = price.replace('₹', '').replace(',', '')
+        return float(price)
+    except (ValueError, TypeError):
+        return float('nan')
+
+
+def parse_rating(rating):
+    """Parse a stored rating into a float (NaN if it can't be parsed)"""
+    try:
+        return float(rating)
+    except (ValueError, TypeError):
+        return float('nan')
+
+
+def format_price(price):
+    """Display form of a stored price, with the currency symbol added if missing"""
+    if isinstance(price, str) and '₹' not in price:
+        return f"₹{price}"
+    return str(price)
+
+
+def encode_strings(strings):
+    """Pack strings into one UTF-8 blob plus an offsets array (string i is blob[offsets[i]:offsets[i+1]])"""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype='int64')
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype='uint8'), offsets
+
+
+def decode_strings(blob, offsets):
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+
+class StringColumn:
+    """Read-only sequence of strings decoded on access from a (possibly memory-mapped) blob"""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+
+class CatalogSnapshot:
+    """
+    In-memory snapshot of the indexed products, built alongside the FAISS index
+
+    Every product sits at the position of its FAISS id: prices and ratings are
+    pre-parsed into float32 columns, categories are interned into int32 codes and
+    the display fields needed to answer a search are kept next to them, so search
+    constraints turn into a bitmap over the id space and results can be formatted
+    without a round trip to MongoDB.
+    """
+
+    def __init__(self):
+        self.valid = np.zeros(0, dtype=bool)
+        self.prices = np.zeros(0, dtype='float32')
+        self.ratings = np.zeros(0, dtype='float32')
+        self.good_reviews = np.zeros(0, dtype=bool)
+        self.category_codes = np.zeros(0, dtype='int32')
+        # Interned category strings (as stored), indexed by category code
+        self.category_names = []
+        self._category_lookup = {}
+        # Display fields, indexed by FAISS id
+        self.titles = []
+        self.price_labels = []
+        self.rating_labels = []
+
+    def __len__(self):
+        return len(self.valid)
+
+    def _grow(self, size):
+        if size <= len(self.valid):
+            return
+        size = max(size, 2 * len(self.valid))
+        extra = size - len(self.valid)
+        self.valid = np.concatenate([self.valid, np.zeros(extra, dtype=bool)])
+        self.prices = np.concatenate([self.prices, np.full(extra, np.nan, dtype='float32')])
+        self.ratings = np.concatenate([self.ratings, np.full(extra, np.nan, dtype='float32')])
+        self.good_reviews = np.concatenate([self.good_reviews, np.zeros(extra, dtype=bool)])
+        self.category_codes = np.concatenate([self.category_codes, np.full(extra, -1, dtype='int32')])
+        self.titles.extend([''] * extra)
+        self.price_labels.extend([''] * extra)
+        self.rating_labels.extend([''] * extra)
+
+    def intern_category(self, category):
+        category = str(category or '')
+        code = self._category_lookup.get(category)
+        if code is None:
+            code = len(self.category_names)
+            self.category_names.append(category)
+            self._category_lookup[category] = code
+        return code
+
+    def set(self, faiss_ids, products):
+        """Store products under their FAISS ids"""
+        if not len(faiss_ids):
+            return
+        self._grow(int(max(faiss_ids)) + 1)
+        for faiss_id, product in zip(faiss_ids, products):
+            reviews = product.get('reviews') or ''
+            self.valid[faiss_id] = True
+            self.prices[faiss_id] = parse_price(product.get('price', '0'))
+            self.ratings[faiss_id] = parse_rating(product.get('rating', 0))
+            self.good_reviews[faiss_id] = isinstance(reviews, str) and 'good' in reviews.lower()
+            self.category_codes[faiss_id] = self.intern_category(product.get('category', 'Uncategorized'))
+            self.titles[faiss_id] = str(product.get('title', 'Unnamed Product'))
+            self.price_labels[faiss_id] = format_price(product.get('price', 'N/A'))
+            self.rating_labels[faiss_id] = str(product.get('rating', 'No rating'))
+
+    def remove(self, faiss_ids):
+        self.valid[np.asarray(faiss_ids, dtype='int64')] = False
+
+    def product(self, faiss_id):
+        """Display fields of one product"""
+        return {
+            'title': self.titles[faiss_id],
+            'price': self.price_labels[faiss_id],
+            'category': self.category_names[self.category_codes[faiss_id]],
+            'rating': self.rating_labels[faiss_id],
+        }
+
+    def allowed_mask(self, max_price=None, min_rating=None, category=None, good_reviews=False):
+        """
+        Boolean mask over FAISS ids of the products matching all given constraints
+
+        Unparseable prices and ratings never exclude a product, like the old
+        post-filter did.
+        """
+        mask = self.valid.copy()
+        if max_price:
+            mask &= ~(self.prices > max_price)
+        if min_rating:
+            mask &= ~(self.ratings < min_rating)
+        if good_reviews:
+            mask &= self.good_reviews
+        if category:
+            category = category.lower()
+            codes = [code for code, name in enumerate(self.category_names) if category in name.lower()]
+            mask &= np.isin(self.category_codes, codes)
+        return mask
+
+    def save(self, directory):
+        """Write every column to its own .npy file, so the snapshot can be memory-mapped"""
+        os.makedirs(directory, exist_ok=True)
+        for name in NUMERIC_COLUMNS:
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+        for name in STRING_COLUMNS:
+            blob, offsets = encode_strings(getattr(self, name))
+            np.save(os.path.join(directory, f'{name}_blob.npy'), blob)
+            np.save(os.path.join(directory, f'{name}_offsets.npy'), offsets)
+
+    @classmethod
+    def load(cls, directory, mmap=False):
+        """
+        Load a saved snapshot
+
+        With mmap=True the columns stay memory-mapped read-only, so processes that
+        load the same snapshot share one physical copy of it. A mapped snapshot
+        can't be modified.
+        """
+        mmap_mode = 'r' if mmap else None
+        snapshot = cls()
+        for name in NUMERIC_COLUMNS:
+            setattr(snapshot, name, np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode))
+        for name in STRING_COLUMNS:
+            blob = np.load(os.path.join(directory, f'{name}_blob.npy'), mmap_mode=mmap_mode)
+            offsets = np.load(os.path.join(directory, f'{name}_offsets.npy'), mmap_mode=mmap_mode)
+            # Category names are few and looked up by value, so always decode them
+            if mmap and name != 'category_names':
+                setattr(snapshot, name, StringColumn(blob, offsets))
+            else:
+                setattr(snapshot, name, decode_strings(blob, offsets))
+        snapshot._category_lookup = {name: code for code, name in enumerate(snapshot.category_names)}
+        return snapshot
+
+
+# Columns written by CatalogSnapshot.save
+NUMERIC_COLUMNS = ('valid', 'prices', 'ratings', 'good_reviews', 'category_codes')
+STRING_COLUMNS = ('category_names', 'titles', 'price_labels', 'rating_labels')
@@ -0,0 +1,76 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency for a while
+
+    After `failure_threshold` consecutive failures the breaker opens and allow()
+    returns False for `reset_timeout` seconds. Then it lets one trial call through
+    (half-open): a success closes the breaker, a failure opens it again. A trial
+    that records no outcome within `reset_timeout` (e.g. an abandoned stream) is
+    replaced by a new one, and release() hands back a trial that ended up not
+    calling the dependency.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the breaker
+        reset_timeout (float): Seconds the breaker stays open before a trial call
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+        self.times_opened = 0
+
+    def allow(self):
+        """Whether a call may be made now"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            now = time.monotonic()
+            if self.state == 'open' and now - self.opened_at >= self.reset_timeout:
+                # Let a single trial call through
+                self.state = 'half_open'
+                self.trial_started_at = now
+                return True
+            if self.state == 'half_open' and now - self.trial_started_at >= self.reset_timeout:
+                # The previous trial never reported back
+                self.trial_started_at = now
+                return True
+            return False
+
+    def release(self):
+        """Give back a call allowed by allow() that didn't reach the dependency"""
+        with self._lock:
+            if self.state == 'half_open':
+                # Let the next caller make the trial call right away
+                self.state = 'open'
+                self.opened_at = time.monotonic() - self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'times_opened': self.times_opened,
+            }
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+import numpy as np
+
+
+def text_hash(text):
+    """Content hash used as the cache key of a text"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Persistent embedding cache keyed by a hash of the embedded text
+
+    Vectors live in a flat float32 file that is memory-mapped, and their keys in a
+    text file with one hash per line (line i is the key of row i). New vectors are
+    only ever appended, so restarts only need to encode texts that are not cached yet.
+
+    Several processes may share a directory: writes happen under an inter-process
+    file lock, after re-reading what the others appended. compact() writes a new
+    generation of both files and switches to it by atomically replacing the metadata
+    file, so vectors other processes have mapped are never modified.
+    """
+
+    def __init__(self, directory, model_name, dimension):
+        self.directory = directory
+        self.model_name = model_name
+        self.dimension = dimension
+        self.meta_path = os.path.join(directory, 'embedding_meta.json')
+        self.lock_path = os.path.join(directory, 'embeddings.lock')
+        self.generation = None
+        os.makedirs(directory, exist_ok=True)
+        with self._locked():
+            self._reload()
+
+    @contextmanager
+    def _locked(self):
+        import fcntl
+        with open(self.lock_path, 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _paths(self, generation):
+        return (os.path.join(self.directory, f'embeddings_{generation}.f32'),
+                os.path.join(self.directory, f'embedding_keys_{generation}.txt'))
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _reload(self):
+        """Read the current generation's keys and map its vectors (call with the lock held)"""
+        meta = self._read_meta()
+        # Start over if the cache was written by a different model
+        if (meta is None or meta.get('model') != self.model_name or meta.get('dimension') != self.dimension
+                or not meta.get('generation')):
+            meta = self._write_generation([], np.empty((0, self.dimension), dtype='float32'))
+
+        vectors_path, keys_path = self._paths(meta['generation'])
+        with open(keys_path) as f:
+            keys = f.read().split()
+
+        # Repair a write interrupted by a crash, so appended rows line up with their keys
+        row_bytes = 4 * self.dimension
+        rows = os.path.getsize(vectors_path) // row_bytes
+        if len(keys) > rows:
+            keys = keys[:rows]
+            self._write_keys(keys_path, keys)
+        if os.path.getsize(vectors_path) != len(keys) * row_bytes:
+            with open(vectors_path, 'r+b') as f:
+                f.truncate(len(keys) * row_bytes)
+
+        self.generation = meta['generation']
+        self.positions = {key: i for i, key in enumerate(keys)}
+        self.vectors = self._map(vectors_path, len(keys))
+
+    def _write_keys(self, keys_path, keys):
+        with open(keys_path + '.tmp', 'w') as f:
+            f.write(''.join(f"{key}\n" for key in keys))
+        os.replace(keys_path + '.tmp', keys_path)
+
+    def _write_generation(self, keys, vectors):
+        """Write keys and vectors as a new generation and make it current (call with the lock held)"""
+        generation = str(time.time_ns())
+        vectors_path, keys_path = self._paths(generation)
+        with open(vectors_path, 'wb') as f:
+            f.write(np.ascontiguousarray(vectors, dtype='float32').tobytes())
+        self._write_keys(keys_path, keys)
+        meta = {'model': self.model_name, 'dimension': self.dimension, 'generation': generation}
+        with open(self.meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(self.meta_path + '.tmp', self.meta_path)
+
+        # Processes still mapping an older generation keep it readable until they reload
+        for name in os.listdir(self.directory):
+            if name.startswith('embedding') and generation not in name and name not in (
+                    os.path.basename(self.meta_path), os.path.basename(self.lock_path)):
+                os.remove(os.path.join(self.directory, name))
+        return meta
+
+    def _map(self, vectors_path, rows):
+        if rows == 0:
+            return np.empty((0, self.dimension), dtype='float32')
+        return np.memmap(vectors_path, dtype='float32', mode='r', shape=(rows, self.dimension))
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _append(self, keys, vectors):
+        """Append rows at the end of the current generation (call with the lock held, after _reload())"""
+        vectors_path, keys_path = self._paths(self.generation)
+        with open(vectors_path, 'ab') as f:
+            f.write(np.ascontiguousarray(vectors, dtype='float32').tobytes())
+        with open(keys_path, 'a') as f:
+            f.write(''.join(f"{key}\n" for key in keys))
+
+        start = len(self.positions)
+        for i, key in enumerate(keys):
+            self.positions[key] = start + i
+        self.vectors = self._map(vectors_path, len(self.positions))
+
+    def encode(self, texts, encode_fn):
+        """
+        Get embeddings for texts, encoding only the ones that are not cached yet
+
+        Args:
+            texts (list): Texts to embed
+            encode_fn (callable): Encodes a list of texts into a 2D array
+
+        Returns:
+            np.ndarray: float32 array of shape (len(texts), dimension)
+        """
+        keys = [text_hash(text) for text in texts]
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self.positions and key not in missing:
+                missing[key] = text
+
+        if missing:
+            # Encoding under the lock lets other processes reuse the result instead
+            # of encoding the same texts again
+            with self._locked():
+                self._reload()
+                missing = {key: text for key, text in missing.items() if key not in self.positions}
+                if missing:
+                    self._append(list(missing), encode_fn(list(missing.values())))
+
+        if not keys:
+            return np.empty((0, self.dimension), dtype='float32')
+        return np.asarray(self.vectors[[self.positions[key] for key in keys]], dtype='float32')
+
+    def compact(self, live_texts):
+        """Drop cached vectors whose texts are no longer in use"""
+        with self._locked():
+            self._reload()
+            live_keys = list(dict.fromkeys(text_hash(text) for text in live_texts))
+            live_keys = [key for key in live_keys if key in self.positions]
+            if len(live_keys) == len(self.positions):
+                return 0
+
+            removed = len(self.positions) - len(live_keys)
+            vectors = np.asarray(self.vectors[[self.positions[key] for key in live_keys]], dtype='float32')
+            self.vectors = None
+            self._write_generation(live_keys, vectors.reshape(-1, self.dimension))
+            self._reload()
+            return removed
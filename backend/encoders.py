@@ -0,0 +1,194 @@
+import argparse
+import os
+import time
+import numpy as np
+
+# Encoder backends: the stock PyTorch model, the same model with int8 dynamically
+# quantized Linear layers, or an ONNX export run with onnxruntime
+ENCODER_BACKENDS = ('sentence-transformers', 'quantized', 'onnx')
+
+
+class QuantizedEncoder:
+    """SentenceTransformer whose Linear layers run as int8 (torch dynamic quantization)"""
+
+    def __init__(self, model_name, model_path=None):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if model_path:
+            # A model saved with `python encoders.py quantize`
+            self.model = torch.load(model_path, weights_only=False)
+        else:
+            self.model = torch.quantization.quantize_dynamic(
+                SentenceTransformer(model_name, device='cpu'), {torch.nn.Linear}, dtype=torch.qint8)
+        self.model.eval()
+
+    def encode(self, texts, batch_size=32):
+        return self.model.encode(texts, batch_size=batch_size)
+
+    def get_sentence_embedding_dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+
+class OnnxEncoder:
+    """
+    ONNX export of a sentence-transformers model run with onnxruntime
+
+    Reproduces the sentence-transformers pipeline of all-MiniLM-L6-v2: transformer,
+    attention-masked mean pooling and L2 normalization.
+    """
+
+    def __init__(self, model_name, model_path, max_length=256):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(f"sentence-transformers/{model_name}")
+        self.session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+        self.max_length = max_length
+
+    def encode(self, texts, batch_size=32):
+        embeddings = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                    max_length=self.max_length, return_tensors='np')
+            inputs = {name: tokens[name].astype('int64') for name in tokens if name in self.input_names}
+            token_embeddings = self.session.run(None, inputs)[0]
+
+            mask = tokens['attention_mask'][..., None].astype('float32')
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            embeddings.append(pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None))
+        if not embeddings:
+            return np.empty((0, self.dimension), dtype='float32')
+        return np.concatenate(embeddings).astype('float32')
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+
+def load_encoder(backend, model_name, model_path=None):
+    """
+    Load the sentence encoder for a backend
+
+    Args:
+        backend (str): One of ENCODER_BACKENDS
+        model_name (str): sentence-transformers model name, e.g. 'all-MiniLM-L6-v2'
+        model_path (str): Local model file ('quantized': optional saved model,
+            'onnx': required .onnx file)
+
+    Returns:
+        Encoder with `encode(texts)` and `get_sentence_embedding_dimension()`
+    """
+    if backend == 'sentence-transformers':
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    if backend == 'quantized':
+        return QuantizedEncoder(model_name, model_path)
+    if backend == 'onnx':
+        if not model_path:
+            raise ValueError("The onnx encoder backend needs ENCODER_MODEL_PATH pointing to an .onnx file")
+        return OnnxEncoder(model_name, model_path)
+    raise ValueError(f"Unknown encoder backend {backend!r}, expected one of {ENCODER_BACKENDS}")
+
+
+def save_quantized(model_name, path):
+    """Quantize a model to int8 and save it for the 'quantized' backend"""
+    import torch
+    torch.save(QuantizedEncoder(model_name).model, path)
+
+
+def export_onnx(model_name, path, quantize=False):
+    """
+    Export the transformer of a sentence-transformers model to ONNX
+
+    Pooling and normalization are done by OnnxEncoder, so only token embeddings
+    are exported. With quantize=True the weights are also converted to int8.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device='cpu')
+    transformer = model[0].auto_model.eval()
+    dummy = model.tokenizer(["an example product search query"], return_tensors='pt')
+    input_names = ['input_ids', 'attention_mask', 'token_type_ids']
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['token_embeddings'] = {0: 'batch', 1: 'sequence'}
+
+    export_path = path + '.fp32' if quantize else path
+    torch.onnx.export(transformer, tuple(dummy[name] for name in input_names), export_path,
+                      input_names=input_names, output_names=['token_embeddings'],
+                      dynamic_axes=dynamic_axes, opset_version=14)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(export_path, path, weight_type=QuantType.QInt8)
+        os.remove(export_path)
+
+
+def benchmark_encoders(reference, candidate, texts, batch_size=32, single_queries=50):
+    """
+    Compare a candidate encoder against the stock model
+
+    Args:
+        reference: Stock encoder
+        candidate: Encoder under test
+        texts (list): Texts to embed
+        batch_size (int): Batch size for the throughput measurement
+        single_queries (int): Number of one-text calls for the latency measurement
+
+    Returns:
+        dict: Per-encoder single-query latency (ms) and batch throughput (texts/s),
+        plus mean and minimum cosine similarity between the two encoders' embeddings
+    """
+    results = {}
+    embeddings = {}
+    for name, encoder in (('reference', reference), ('candidate', candidate)):
+        encoder.encode(texts[:1])  # Warm up
+
+        start = time.perf_counter()
+        for text in texts[:single_queries]:
+            encoder.encode([text])
+        latency_ms = 1000 * (time.perf_counter() - start) / min(single_queries, len(texts))
+
+        start = time.perf_counter()
+        embeddings[name] = np.asarray(encoder.encode(texts, batch_size=batch_size), dtype='float32')
+        throughput = len(texts) / (time.perf_counter() - start)
+
+        results[name] = {'latency_ms': latency_ms, 'throughput': throughput}
+
+    a, b = embeddings['reference'], embeddings['candidate']
+    cosine = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    results['cosine_mean'] = float(cosine.mean())
+    results['cosine_min'] = float(cosine.min())
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build and benchmark CPU encoder backends")
+    parser.add_argument('command', choices=['quantize', 'export-onnx', 'benchmark'])
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--path', help="Model file to write, or to benchmark")
+    parser.add_argument('--backend', default='onnx', choices=ENCODER_BACKENDS[1:],
+                        help="Backend to benchmark against the stock model")
+    parser.add_argument('--int8', action='store_true', help="Quantize the ONNX export to int8")
+    parser.add_argument('--texts', help="File with one benchmark text per line")
+    args = parser.parse_args()
+
+    if args.command == 'quantize':
+        save_quantized(args.model, args.path)
+    elif args.command == 'export-onnx':
+        export_onnx(args.model, args.path, quantize=args.int8)
+    else:
+        if args.texts:
+            with open(args.texts) as f:
+                texts = [line.strip() for line in f if line.strip()]
+        else:
+            texts = [f"{item} {category} under {price}"
+                     for item in ('blue hoodie', 'white sneakers', 'denim jeans', 'leather bag', 'sports watch')
+                     for category in ('men', 'women', 'casual', 'formal')
+                     for price in (500, 1000, 2500, 5000, 10000)]
+        reference = load_encoder('sentence-transformers', args.model)
+        candidate = load_encoder(args.backend, args.model, args.path)
+        for key, value in benchmark_encoders(reference, candidate, texts).items():
+            print(f"{key}: {value}")
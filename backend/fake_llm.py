@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """
+    Local stand-in for genai.GenerativeModel, for tests and offline development
+
+    Answers every prompt with a canned text, optionally after a delay, and streams
+    it in fixed-size chunks when called with stream=True.
+
+    Args:
+        reply: Text to answer with, or `prompt -> text`
+        delay (float): Seconds before the first chunk (or the whole response)
+        chunk_size (int): Characters per streamed chunk
+        chunk_delay (float): Seconds between streamed chunks
+    """
+
+    def __init__(self, reply="This is a local test response.", delay=0.0, chunk_size=16, chunk_delay=0.0):
+        self.reply = reply
+        self.delay = delay
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+
+    def _text(self, prompt):
+        self.calls += 1
+        return self.reply(prompt) if callable(self.reply) else self.reply
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        text = self._text(prompt)
+        if stream:
+            return self._stream(text)
+        time.sleep(self.delay)
+        return FakeResponse(text)
+
+    def _stream(self, text):
+        time.sleep(self.delay)
+        for start in range(0, len(text), self.chunk_size):
+            if start:
+                time.sleep(self.chunk_delay)
+            yield FakeResponse(text[start:start + self.chunk_size])
+
+    async def generate_content_async(self, prompt, **kwargs):
+        text = self._text(prompt)
+        await asyncio.sleep(self.delay)
+        return FakeResponse(text)
@@ -1,53 +1,90 @@
-def get_faq_answer(query):
+import json
+import os
+import numpy as np
+from intent_engine import KeywordMatcher
+
+# FAQ entries (id, keywords, example questions, answer), matched in file order
+FAQ_PATH = os.getenv("FAQ_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "faqs.json"))
+
+# Minimum cosine similarity between a query and an FAQ question for a semantic match
+FAQ_MATCH_THRESHOLD = 0.6
+
+
+class FaqStore:
+    """
+    FAQ answers looked up by meaning, with keyword matching as a fallback
+
+    build_index() embeds every example question into one normalized matrix, so a
+    lookup is a single matrix-vector product and an argmax over all questions.
+    Until it is built, or when no question is similar enough, the first entry
+    whose keywords occur in the query answers.
+
+    Args:
+        path (str): JSON file with 'faqs' (list of entries) and 'fallback' (answer
+            when nothing matches)
+        threshold (float): Minimum similarity for a semantic match
+    """
+
+    def __init__(self, path, threshold=FAQ_MATCH_THRESHOLD):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.entries = data['faqs']
+        self.fallback = data['fallback']
+        self.threshold = threshold
+        self.answers = {entry['id']: entry['answer'] for entry in self.entries}
+        self.keyword_matcher = KeywordMatcher({entry['id']: entry['keywords'] for entry in self.entries})
+        self.question_matrix = None
+        self.question_entries = None
+
+    def build_index(self, encode_fn):
+        """Embed every example question with `encode_fn(texts) -> embeddings`"""
+        questions = [(position, question) for position, entry in enumerate(self.entries)
+                     for question in entry['questions']]
+        matrix = np.asarray(encode_fn([question for _, question in questions]), dtype='float32')
+        matrix /= np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+        # Set the matrix last, lookups use it as the sign the index is ready
+        self.question_entries = np.array([position for position, _ in questions], dtype='int32')
+        self.question_matrix = matrix
+
+    @property
+    def indexed(self):
+        return self.question_matrix is not None
+
+    def match(self, query, query_embedding=None):
+        """The best matching entry id, or None"""
+        if query_embedding is not None and self.question_matrix is not None:
+            query_embedding = np.asarray(query_embedding, dtype='float32')
+            similarities = self.question_matrix @ (query_embedding / max(np.linalg.norm(query_embedding), 1e-12))
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                return self.entries[self.question_entries[best]]['id']
+
+        matches = self.keyword_matcher.match(query)
+        for entry in self.entries:
+            if matches.has(entry['id']):
+                return entry['id']
+        return None
+
+    def answer(self, query, query_embedding=None):
+        entry_id = self.match(query, query_embedding)
+        return self.answers[entry_id] if entry_id else self.fallback
+
+
+faq_store = FaqStore(FAQ_PATH)
+
+# Every FAQ answer, including the fallback, by entry id
+faq_answers = {**faq_store.answers, 'unknown': faq_store.fallback}
+
+def get_faq_answer(query, query_embedding=None):
     """
     Get answers to frequently asked questions
-    
+
     Args:
         query (str): User's FAQ query
-        
+        query_embedding (np.ndarray): Embedding of the query, to match by meaning
+            once faq_store has been indexed
+
     Returns:
         str: FAQ response
     """
-    query_lower = query.lower()
-    
-    if any(word in query_lower for word in ['policy', 'policies']):
-        return """Our policies include:
-1. Free returns within 30 days
-2. Free shipping on orders over ₹1000
-3. Secure payment options
-4. 24/7 customer support"""
-    
-    elif any(word in query_lower for word in ['shipping', 'delivery']):
-        return """We offer:
-1. Standard shipping (3-5 business days)
-2. Express shipping (1-2 business days)
-3. Free shipping on orders over ₹1000"""
-    
-    elif any(word in query_lower for word in ['return', 'exchange']):
-        return """Our return policy:
-1. Free returns within 30 days
-2. Items must be unused and in original packaging
-3. Refunds processed within 5 business days"""
-    
-    elif any(word in query_lower for word in ['payment', 'pay']):
-        return """We accept:
-1. Credit/Debit cards
-2. Net banking
-3. UPI
-4. EMI options"""
-    
-    elif any(word in query_lower for word in ['track', 'tracking']):
-        return """You can track your order:
-1. Log in to your account
-2. Go to 'My Orders'
-3. Click 'Track Order'
-4. You'll see the latest status and tracking number"""
-    
-    elif any(word in query_lower for word in ['order', 'status']):
-        return """To check your order status:
-1. Log in to your account
-2. Go to 'My Orders'
-3. You'll see the status of all your recent orders"""
-    
-    else:
-        return "I'm not sure how to help with that. You can ask me about shipping, returns, payments, or order tracking."
\ No newline at end of file
+    return faq_store.answer(query, query_embedding)
@@ -1,3 +1,5 @@
+from intent_engine import analyze
+
 # Dictionary of pre-defined fashion advice responses
 fashion_advice_responses = {
     'wedding': """For a wedding, consider these options:
@@ -50,36 +52,9 @@ Clean, minimal white sneakers are still very much in style and are considered a
 3. Monochromatic: Different shades of the same color create an elegant look
 4. Statement piece: Use one bold color as a statement against neutral pieces
 
-For beginners, the 60-30-10 rule works well: 60% dominant color, 30% secondary color, 10% accent color."""
-}
+For beginners, the 60-30-10 rule works well: 60% dominant color, 30% secondary color, 10% accent color.""",
 
-def get_fashion_advice(query):
-    query_lower = query.lower()
-    
-    # Check for specific fashion scenarios
-    if any(word in query_lower for word in ['wedding', 'formal event', 'ceremony']):
-        return fashion_advice_responses['wedding']
-    
-    elif any(word in query_lower for word in ['casual', 'everyday', 'day to day']):
-        return fashion_advice_responses['casual']
-    
-    elif any(word in query_lower for word in ['office', 'work', 'business', 'professional']):
-        return fashion_advice_responses['office']
-    
-    elif any(word in query_lower for word in ['date', 'dinner', 'restaurant']):
-        return fashion_advice_responses['date']
-    
-    elif any(word in query_lower for word in ['trend', 'trending', 'fashion']):
-        return fashion_advice_responses['trends']
-    
-    elif any(word in query_lower for word in ['sneaker', 'white sneaker', 'shoe']):
-        return fashion_advice_responses['sneakers']
-    
-    elif any(word in query_lower for word in ['color', 'match', 'combination']):
-        return fashion_advice_responses['colors']
-    
-    # Generic response if no specific match is found
-    return """I can provide fashion advice for different occasions:
+    'general': """I can provide fashion advice for different occasions:
 1. For formal events like weddings
 2. For casual everyday wear
 3. For office or professional settings
@@ -88,4 +63,16 @@ def get_fashion_advice(query):
 6. About specific items like sneakers
 7. About color matching and combinations
 
-Could you specify what type of fashion advice you're looking for?"""
\ No newline at end of file
+Could you specify what type of fashion advice you're looking for?"""
+}
+
+def get_fashion_advice(query):
+    matches = analyze(query)
+    
+    # Check for specific fashion scenarios
+    for scenario in ('wedding', 'casual', 'office', 'date', 'trends', 'sneakers', 'colors'):
+        if matches.has(f'fashion:{scenario}'):
+            return fashion_advice_responses[scenario]
+    
+    # Generic response if no specific match is found
+    return fashion_advice_responses['general']
\ No newline at end of file
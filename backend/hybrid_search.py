@@ -0,0 +1,141 @@
+import argparse
+import json
+import math
+import os
+import time
+import numpy as np
+from text_index import InvertedIndex, tokenize
+
+# Rank constant of reciprocal rank fusion: larger values flatten the difference
+# between the top ranks of each list
+DEFAULT_RRF_K = 60
+
+BENCHMARK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_benchmark.json")
+
+
+def reciprocal_rank_fusion(rankings, weights=None, k=DEFAULT_RRF_K, limit=None):
+    """
+    Fuse ranked lists of ids by weighted reciprocal rank
+
+    An id scores sum(weight / (k + rank)) over the lists it appears in (rank from 1),
+    so ids ranked high by several lists come first without comparing their raw
+    scores, which live on different scales (BM25 vs vector distance).
+
+    Args:
+        rankings (list): Lists of ids, best first
+        weights (list): Weight of each list, 1.0 each by default
+        k (int): Rank constant
+        limit (int): Number of ids to return, None for all
+
+    Returns:
+        list: Fused ids, best first (ties keep the order they were first seen in)
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank)
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return fused if limit is None else fused[:limit]
+
+
+def relevance_metrics(ranked, relevant, k):
+    """Recall, reciprocal rank and nDCG at k of one ranked list against the relevant ids"""
+    ranked = ranked[:k]
+    hits = [doc_id in relevant for doc_id in ranked]
+    first_hit = hits.index(True) + 1 if any(hits) else None
+    dcg = sum(1 / math.log2(rank + 1) for rank, hit in enumerate(hits, 1) if hit)
+    ideal = sum(1 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return {
+        'recall': sum(hits) / len(relevant) if relevant else 0.0,
+        'mrr': 1 / first_hit if first_hit else 0.0,
+        'ndcg': dcg / ideal if ideal else 0.0,
+    }
+
+
+# Same text app.build_product_text embeds
+def product_text(product):
+    return (f"{product.get('title', 'Unknown Product')} {product.get('category', 'Uncategorized')} "
+            f"{product.get('review', '')} price: {product.get('price', '0')}")
+
+
+def benchmark(products, queries, encode_fn, k=10, candidates=20, weight_grid=((1.0, 1.0),), rrf_k=DEFAULT_RRF_K):
+    """
+    Compare semantic, lexical and hybrid retrieval on labelled queries
+
+    Semantic search is exact inner product search over normalized product
+    embeddings, the ranking a flat FAISS index gives.
+
+    Args:
+        products (list): Product dicts with an 'id'
+        queries (list): {'query': text, 'relevant': [product ids]} dicts
+        encode_fn: `texts -> embeddings`
+        k (int): Cutoff of the relevance metrics
+        candidates (int): Results taken from each side before fusion
+        weight_grid (list): (semantic, lexical) weights to try for hybrid search
+
+    Returns:
+        dict: Per mode mean recall, MRR and nDCG at k, and mean/p95 latency in ms
+    """
+    ids = [product['id'] for product in products]
+    vectors = np.asarray(encode_fn([product_text(product) for product in products]), dtype='float32')
+    vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    lexical_index = InvertedIndex()
+    for position, product in enumerate(products):
+        lexical_index.add(position, f"{product.get('title', '')} {product.get('category', '')}")
+
+    def semantic(query):
+        embedding = np.asarray(encode_fn([query]), dtype='float32')[0]
+        scores = vectors @ (embedding / max(float(np.linalg.norm(embedding)), 1e-12))
+        return np.argsort(-scores)[:candidates].tolist()
+
+    def lexical(query):
+        return [position for position, _ in lexical_index.search(tokenize(query), k=candidates, mode='or')]
+
+    modes = {'semantic': semantic, 'lexical': lexical}
+    for semantic_weight, lexical_weight in weight_grid:
+        modes[f"hybrid({semantic_weight:g},{lexical_weight:g})"] = (
+            lambda query, weights=(semantic_weight, lexical_weight):
+            reciprocal_rank_fusion([semantic(query), lexical(query)], weights, rrf_k, k))
+
+    results = {}
+    for name, search_fn in modes.items():
+        totals = {'recall': 0.0, 'mrr': 0.0, 'ndcg': 0.0}
+        latencies = []
+        for labelled in queries:
+            start = time.perf_counter()
+            ranked = search_fn(labelled['query'])
+            latencies.append(1000 * (time.perf_counter() - start))
+            metrics = relevance_metrics([ids[position] for position in ranked], set(labelled['relevant']), k)
+            for key, value in metrics.items():
+                totals[key] += value
+        results[name] = {f"{key}@{k}": value / len(queries) for key, value in totals.items()}
+        results[name]['latency_ms'] = float(np.mean(latencies))
+        results[name]['p95_ms'] = float(np.percentile(latencies, 95))
+    return results
+
+
+if __name__ == '__main__':
+    from encoders import ENCODER_BACKENDS, load_encoder
+
+    parser = argparse.ArgumentParser(description="Benchmark semantic, lexical and hybrid product search offline")
+    parser.add_argument('--data', default=BENCHMARK_PATH,
+                        help="JSON file with 'products' (each with an 'id') and labelled 'queries'")
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--backend', default='sentence-transformers', choices=ENCODER_BACKENDS)
+    parser.add_argument('--path', help="Model file of the quantized/onnx backends")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--candidates', type=int, default=20)
+    parser.add_argument('--rrf-k', type=int, default=DEFAULT_RRF_K)
+    parser.add_argument('--weights', nargs='+', default=['1,1', '1,2', '2,1'],
+                        help="semantic,lexical weight pairs to try")
+    args = parser.parse_args()
+
+    with open(args.data) as f:
+        data = json.load(f)
+    encoder = load_encoder(args.backend, args.model, args.path)
+    weight_grid = [tuple(float(weight) for weight in pair.split(',')) for pair in args.weights]
+    report = benchmark(data['products'], data['queries'], encoder.encode, k=args.k,
+                       candidates=args.candidates, weight_grid=weight_grid, rrf_k=args.rrf_k)
+    for name, result in report.items():
+        print(f"{name}: {result}")
@@ -0,0 +1,154 @@
+import argparse
+import re
+import time
+from functools import lru_cache
+
+# Every keyword set the chatbot matches messages against, compiled into one matcher.
+# Keywords match anywhere in the lowercased message, like `keyword in message.lower()`;
+# where a caller picks one keyword of a set, earlier keywords win.
+KEYWORD_SETS = {
+    # Chatbot routing (app.classify_message)
+    'availability': ['available', 'in stock', 'do you have', 'do you sell', 'availability'],
+    'product_search': ['find', 'search', 'looking for', 'show me', 'product', 'buy'],
+    'fashion_advice': ['wear', 'outfit', 'fashion', 'style', 'trend', 'dress', 'match', 'fashionable', 'stylish'],
+    'faq': ['policy', 'shipping', 'return', 'delivery', 'payment', 'track', 'order', 'how do i', 'how to'],
+    'search_fallback': ['product', 'find', 'search'],
+
+    # Fashion advice topics (fashion_advice.get_fashion_advice)
+    'fashion:wedding': ['wedding', 'formal event', 'ceremony'],
+    'fashion:casual': ['casual', 'everyday', 'day to day'],
+    'fashion:office': ['office', 'work', 'business', 'professional'],
+    'fashion:date': ['date', 'dinner', 'restaurant'],
+    'fashion:trends': ['trend', 'trending', 'fashion'],
+    'fashion:sneakers': ['sneaker', 'white sneaker', 'shoe'],
+    'fashion:colors': ['color', 'match', 'combination'],
+
+    # Product attributes (product_availability)
+    'product_type': ['shirt', 'pants', 'jeans', 'dress', 'top', 'hoodie', 'shoes', 'sneakers',
+                     'watch', 'bag', 'jacket', 'sweater', 't-shirt', 'tshirt', 'socks'],
+    'color': ['black', 'white', 'red', 'blue', 'green', 'yellow', 'purple', 'pink',
+              'brown', 'gray', 'grey', 'orange', 'navy', 'beige'],
+    'gender:men': ['men', 'man', 'male', 'boy', 'guys'],
+    'gender:women': ['women', 'woman', 'female', 'girl', 'ladies'],
+}
+
+
+class Matches:
+    """Keyword matches in one message"""
+
+    def __init__(self, text, hits, keyword_sets):
+        self.text = text  # Lowercased message
+        self.hits = hits  # (start, keyword, set names) for every occurrence, in text order
+        self._keyword_sets = keyword_sets
+        self.by_set = {}
+        for start, keyword, names in hits:
+            for name in names:
+                self.by_set.setdefault(name, []).append((start, keyword))
+
+    def has(self, name):
+        """Whether any keyword of a set occurs in the message"""
+        return name in self.by_set
+
+    def intents(self):
+        """Names of every matched keyword set"""
+        return list(self.by_set)
+
+    def first(self, name):
+        """The matched keyword declared earliest in a set, None if none matched"""
+        found = {keyword for _, keyword in self.by_set.get(name, ())}
+        for keyword in self._keyword_sets[name]:
+            if keyword in found:
+                return keyword
+        return None
+
+
+def trie_regex(node):
+    """Regex matching the shortest keyword of a trie, branching one character at a time"""
+    if None in node:
+        return ''
+    branches = [re.escape(char) + trie_regex(child) for char, child in sorted(node.items())]
+    return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+
+class KeywordMatcher:
+    """
+    Finds every occurrence of keywords from many named sets in one pass
+
+    All keywords are compiled into one regex whose lookahead finds every position
+    where some keyword starts; a trie walked from those positions then yields all
+    keywords starting there, including overlapping and nested ones.
+    """
+
+    def __init__(self, keyword_sets):
+        self.keyword_sets = keyword_sets
+        self.trie = {}
+        for name, keywords in keyword_sets.items():
+            for keyword in keywords:
+                node = self.trie
+                for char in keyword:
+                    node = node.setdefault(char, {})
+                node.setdefault(None, []).append(name)
+
+        self.pattern = re.compile('(?=' + trie_regex(self.trie) + ')')
+
+    def match(self, text):
+        text = text.lower()
+        hits = []
+        for candidate in self.pattern.finditer(text):
+            start = candidate.start()
+            node = self.trie
+            for end in range(start, len(text)):
+                node = node.get(text[end])
+                if node is None:
+                    break
+                if None in node:
+                    hits.append((start, text[start:end + 1], node[None]))
+        return Matches(text, hits, self.keyword_sets)
+
+
+matcher = KeywordMatcher(KEYWORD_SETS)
+
+
+@lru_cache(maxsize=1024)
+def analyze(message):
+    """Keyword matches of a message, cached so every module handling it shares one pass"""
+    return matcher.match(message)
+
+
+def benchmark(messages, repeats=1000):
+    """
+    Per-message cost of routing with chained keyword scans vs. one matcher pass
+
+    Returns:
+        dict: Mean microseconds per message for each approach
+    """
+    routing_sets = [KEYWORD_SETS[name] for name in KEYWORD_SETS]
+
+    def chained_scans(message):
+        return [any(keyword in message.lower() for keyword in keywords) for keywords in routing_sets]
+
+    results = {}
+    for name, route in (('chained_scans', chained_scans), ('keyword_matcher', matcher.match)):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for message in messages:
+                route(message)
+        results[name] = 1e6 * (time.perf_counter() - start) / (repeats * len(messages))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark keyword intent matching")
+    parser.add_argument('--repeats', type=int, default=1000)
+    args = parser.parse_args()
+
+    messages = [
+        "Do you have blue shirts for men in stock?",
+        "Show me white sneakers under 2000 with good reviews",
+        "What should I wear to a wedding this weekend?",
+        "How do I track my order?",
+        "What is your return policy for shoes bought online?",
+        "Tell me something about ShopMart",
+    ]
+    for name, microseconds in benchmark(messages, args.repeats).items():
+        print(f"{name}: {microseconds:.1f} us/message")
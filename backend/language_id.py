@@ -0,0 +1,280 @@
+import argparse
+import math
+import re
+import time
+from collections import Counter
+from query_cache import LRUCache
+
+# Languages told apart by their script, checked in order (kana before Han, since
+# Japanese text mixes both)
+SCRIPT_RANGES = (
+    ('ja', ((0x3040, 0x309F), (0x30A0, 0x30FF))),
+    ('zh-cn', ((0x4E00, 0x9FFF), (0x3400, 0x4DBF))),
+    ('hi', ((0x0900, 0x097F),)),
+    ('ru', ((0x0400, 0x04FF),)),
+    ('ar', ((0x0600, 0x06FF), (0x0750, 0x077F))),
+)
+
+# Latin-script languages, told apart by function words (articles, pronouns,
+# prepositions, conjunctions, common auxiliaries), greetings, accented letters and
+# character trigrams. Product words are deliberately left out: shoppers mix them
+# across languages ("kurta", "jeans", "party wear").
+STOPWORDS = {
+    'en': {'the', 'a', 'an', 'and', 'or', 'but', 'is', 'are', 'was', 'be', 'i', 'you', 'my', 'your', 'me', 'it',
+           'this', 'that', 'these', 'to', 'of', 'for', 'with', 'in', 'on', 'at', 'from', 'by', 'do', 'does', 'have',
+           'has', 'can', 'what', 'how', 'where', 'which', 'who', 'any', 'some', 'no', 'not', 'as',
+           'hi', 'hello', 'hey', 'thanks', 'please'},
+    'es': {'el', 'la', 'los', 'las', 'un', 'una', 'unos', 'unas', 'de', 'del', 'al', 'que', 'y', 'o', 'en', 'es',
+           'por', 'para', 'con', 'sin', 'mi', 'mis', 'tu', 'su', 'sus', 'lo', 'yo', 'se', 'muy', 'pero', 'este',
+           'esta', 'estos', 'hay', 'cómo', 'qué', 'dónde', 'cuál', 'cuánto',
+           'hola', 'gracias'},
+    'fr': {'le', 'la', 'les', 'un', 'une', 'des', 'du', 'de', 'au', 'aux', 'et', 'ou', 'est', 'pour', 'avec',
+           'dans', 'sur', 'je', 'tu', 'il', 'elle', 'nous', 'vous', 'mon', 'ma', 'mes', 'ton', 'ta', 'sa', 'ses',
+           'ce', 'cette', 'ces', 'ne', 'pas', 'qui', 'quoi', 'où', 'quel', 'quelle', 'quels', 'quelles', 'à',
+           'bonjour', 'salut', 'merci'},
+    'de': {'der', 'die', 'das', 'den', 'dem', 'ein', 'eine', 'einen', 'einem', 'und', 'oder', 'ist', 'sind',
+           'ich', 'du', 'er', 'sie', 'wir', 'ihr', 'für', 'mit', 'von', 'zu', 'zum', 'zur', 'auf', 'aus', 'bei',
+           'nach', 'nicht', 'wie', 'wo', 'mein', 'meine', 'dein', 'haben', 'habe', 'kann', 'gibt', 'es', 'auch',
+           'hallo', 'danke', 'bitte'},
+    'pt': {'o', 'os', 'a', 'as', 'um', 'uma', 'uns', 'umas', 'de', 'do', 'da', 'dos', 'das', 'que', 'e', 'em',
+           'no', 'na', 'nos', 'nas', 'ao', 'por', 'para', 'com', 'eu', 'meu', 'minha', 'seu', 'sua', 'não',
+           'você', 'vocês', 'é', 'onde',
+           'olá', 'obrigado', 'obrigada'},
+}
+ACCENTS = {
+    'es': 'ñ¿¡áíóú',
+    'fr': 'çàâèêëîïôûùœ',
+    'de': 'äöüß',
+    'pt': 'ãõçâêôáéíóú',
+}
+# Marks only one of these languages uses, enough on their own even in a message
+# of one or two words ("¿Tienen camisas?")
+MARKERS = {
+    'es': '¿¡ñ',
+    'fr': 'œ',
+    'de': 'ß',
+    'pt': 'ãõ',
+}
+
+# Text the trigram profiles are built from
+TRAINING_TEXT = {
+    'en': "Hello, I am looking for a blue shirt for the office. Do you have white sneakers in my size? "
+          "What is your return policy and how long does shipping take? Show me something nice to wear to "
+          "a wedding. I want to track my order. Which jackets are trending this winter? Can I pay with "
+          "my card? The price should be under two thousand rupees with good reviews.",
+    'es': "Hola, estoy buscando una camisa azul para la oficina. ¿Tienen zapatillas blancas en mi talla? "
+          "¿Cuál es su política de devoluciones y cuánto tarda el envío? Muéstrame algo bonito para una "
+          "boda. Quiero rastrear mi pedido. ¿Qué chaquetas están de moda este invierno? ¿Puedo pagar con "
+          "mi tarjeta? El precio debe ser menos de dos mil rupias con buenas reseñas.",
+    'fr': "Bonjour, je cherche une chemise bleue pour le bureau. Avez-vous des baskets blanches à ma "
+          "taille ? Quelle est votre politique de retour et combien de temps prend la livraison ? "
+          "Montrez-moi quelque chose de joli pour un mariage. Je veux suivre ma commande. Quelles vestes "
+          "sont à la mode cet hiver ? Puis-je payer avec ma carte ? Le prix doit être inférieur à deux "
+          "mille roupies avec de bons avis.",
+    'de': "Hallo, ich suche ein blaues Hemd für das Büro. Haben Sie weiße Turnschuhe in meiner Größe? "
+          "Wie lauten Ihre Rückgaberichtlinien und wie lange dauert der Versand? Zeigen Sie mir etwas "
+          "Schönes für eine Hochzeit. Ich möchte meine Bestellung verfolgen. Welche Jacken sind diesen "
+          "Winter angesagt? Kann ich mit meiner Karte bezahlen? Der Preis sollte unter zweitausend "
+          "Rupien liegen und gute Bewertungen haben.",
+    'pt': "Olá, estou procurando uma camisa azul para o escritório. Vocês têm tênis brancos no meu "
+          "tamanho? Qual é a política de devolução e quanto tempo demora o envio? Mostre-me algo bonito "
+          "para um casamento. Quero rastrear meu pedido. Quais jaquetas estão na moda neste inverno? "
+          "Posso pagar com meu cartão? O preço deve ser menos de dois mil rúpias com boas avaliações.",
+}
+
+# Labelled chat messages for benchmark()
+BENCHMARK_SAMPLES = [
+    ('en', "show me red dresses"), ('en', "where is my order"), ('en', "do you ship to Mumbai?"),
+    ('en', "any black jeans under 1500"), ('en', "what should I wear to a party"),
+    ('es', "busco unos zapatos negros"), ('es', "¿dónde está mi pedido?"), ('es', "quiero un vestido rojo"),
+    ('es', "¿hacen envíos a Madrid?"), ('es', "necesito unos pantalones para el trabajo"),
+    ('fr', "je cherche des chaussures noires"), ('fr', "où est ma commande ?"), ('fr', "une robe rouge svp"),
+    ('fr', "livrez-vous à Paris ?"), ('fr', "que dois-je porter pour une fête"),
+    ('de', "ich suche schwarze Schuhe"), ('de', "wo ist meine Bestellung?"), ('de', "ein rotes Kleid bitte"),
+    ('de', "liefern Sie nach Berlin?"), ('de', "was soll ich zur Party anziehen"),
+    ('pt', "procuro uns sapatos pretos"), ('pt', "onde está meu pedido?"), ('pt', "quero um vestido vermelho"),
+    ('pt', "vocês entregam em Lisboa?"), ('pt', "o que devo vestir para uma festa"),
+    ('zh-cn', "我想买一件红色的裙子"), ('ja', "赤いドレスを探しています"), ('hi', "मुझे लाल ड्रेस चाहिए"),
+    ('ru', "я ищу черные туфли"), ('ar', "أبحث عن فستان أحمر"),
+]
+
+# Messages the word lists were not written from, including English queries made
+# only of product words
+HELDOUT_SAMPLES = [
+    ('en', "blue denim jeans"), ('en', "suggest party wear"), ('en', "party wear dresses"),
+    ('en', "ladies handbags sale"), ('en', "buy kurta online"), ('en', "check delivery status"),
+    ('en', "summer dresses online"), ('en', "cotton saree"), ('en', "mens formal shoes size 9"),
+    ('en', "return policy"), ('en', "track order"), ('en', "leather belt brown"),
+    ('en', "gift for my son"), ('en', "café racer jacket"),
+    ('en', "cheap sneakers under 2000"), ('en', "I'm looking for a wallet"),
+    ('es', "necesito una chaqueta de cuero"), ('es', "¿tienen camisetas en talla M?"),
+    ('es', "hola"), ('fr', "avez-vous des sacs en cuir ?"), ('fr', "merci beaucoup"),
+    ('fr', "je voudrais retourner ma commande"), ('de', "habt ihr Jacken aus Leder?"),
+    ('de', "ich möchte meine Bestellung zurückgeben"), ('pt', "vocês têm jaquetas de couro?"),
+    ('pt', "quero devolver o meu pedido"),
+]
+
+WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+def trigrams(word):
+    padded = f" {word} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def build_profiles(training_text):
+    """Smoothed log-probabilities of the character trigrams of each language"""
+    profiles = {}
+    for lang, text in training_text.items():
+        counts = Counter(gram for word in WORD_RE.findall(text.lower()) for gram in trigrams(word))
+        total = sum(counts.values()) + len(counts) + 1
+        profiles[lang] = ({gram: math.log((count + 1) / total) for gram, count in counts.items()},
+                          math.log(1 / total))
+    return profiles
+
+
+class LanguageIdentifier:
+    """
+    Deterministic language identification restricted to a set of languages
+
+    Non-Latin scripts decide the language directly. A Latin-script message is only
+    given another language than English when it has more of that language's
+    function words and accented letters than English function words, or one of its
+    own marks (¿, ñ, ß, ...); a character trigram model breaks ties between such
+    languages. It is English when it has more English function words than any
+    other language's evidence. Anything else (no evidence, or as much for English
+    as for another language) is undetermined and goes to the fallback. Results are
+    cached per message.
+
+    Args:
+        languages: Language codes that may be returned
+        default (str): Language returned for undetermined messages without a
+            fallback, or when the fallback fails
+        cache_size (int): Messages whose language is cached
+        fallback: `(text) -> language code` for undetermined messages, e.g. the
+            translator's detection
+    """
+
+    def __init__(self, languages, default='en', cache_size=10000, fallback=None):
+        self.languages = set(languages)
+        self.default = default
+        self.fallback = fallback
+        self.latin_languages = [lang for lang in STOPWORDS if lang in self.languages]
+        self.profiles = build_profiles({lang: TRAINING_TEXT[lang] for lang in self.latin_languages})
+        self.cache = LRUCache(cache_size)
+
+    def detect(self, text):
+        language = self.cache.get(text)
+        if language is None:
+            language = self._detect(text)
+            if language is None and self.fallback is not None:
+                try:
+                    language = self.fallback(text)
+                except Exception as e:
+                    # Not cached, so the fallback is asked again next time
+                    print(f"Language detection fallback error: {e}")
+                    return self.default
+            if language is None:
+                language = self.default
+            self.cache.set(text, language)
+        return language
+
+    def _detect(self, text):
+        script = self._script_language(text)
+        if script:
+            return script
+
+        words = WORD_RE.findall(text.lower())
+        if not words or not self.latin_languages:
+            return None
+
+        # Evidence for another language: its function words that aren't also English
+        # ones, and its distinct accented letters. It has to outweigh the English
+        # function words (product names carry no signal), and a single accented
+        # letter alone (a brand like "café") isn't enough unless it is a mark only
+        # that language uses.
+        english_hits = sum(word in STOPWORDS['en'] for word in words)
+        characters = set(text.lower())
+        evidence = {}
+        most_other = 0
+        for lang in self.latin_languages:
+            if lang == 'en':
+                continue
+            exclusive = STOPWORDS[lang] - STOPWORDS['en']
+            word_hits = sum(word in exclusive for word in words)
+            accent_hits = len(set(ACCENTS.get(lang, '')) & characters)
+            marked = bool(set(MARKERS.get(lang, '')) & characters)
+            most_other = max(most_other, word_hits + accent_hits)
+            if word_hits + accent_hits > english_hits and (word_hits or accent_hits > 1 or marked):
+                evidence[lang] = word_hits + accent_hits
+        if not evidence:
+            return 'en' if english_hits > most_other and 'en' in self.languages else None
+
+        # Trigrams break ties between languages with as much evidence (e.g. 'la', 'de')
+        grams = [gram for word in words for gram in trigrams(word)]
+        most = max(evidence.values())
+        def trigram_score(lang):
+            log_probs, unseen = self.profiles[lang]
+            return sum(log_probs.get(gram, unseen) for gram in grams) / len(grams)
+        return max((lang for lang, hits in evidence.items() if hits == most), key=trigram_score)
+
+    def _script_language(self, text):
+        counts = Counter()
+        for char in text:
+            code = ord(char)
+            if code < 0x0370:
+                continue
+            for lang, ranges in SCRIPT_RANGES:
+                if any(low <= code <= high for low, high in ranges):
+                    counts[lang] += 1
+                    break
+        for lang, _ in SCRIPT_RANGES:
+            if counts[lang] and lang in self.languages:
+                return lang
+        return None
+
+
+def benchmark(identifier, samples=BENCHMARK_SAMPLES, repeats=20):
+    """
+    Compare an identifier against langdetect on labelled messages
+
+    Returns:
+        dict: Per detector accuracy and mean latency in microseconds (uncached
+        for the local identifier)
+    """
+    detectors = {'local': lambda text: identifier._detect(text) or identifier.default}
+    try:
+        from langdetect import DetectorFactory, detect
+
+        DetectorFactory.seed = 0
+        # langdetect returns 'zh-cn' for Chinese like the local identifier
+        detectors['langdetect'] = detect
+    except ImportError:
+        print("langdetect is not installed, benchmarking the local identifier only")
+
+    results = {}
+    for name, detect_fn in detectors.items():
+        correct = 0
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for expected, text in samples:
+                try:
+                    correct += detect_fn(text) == expected
+                except Exception:
+                    pass
+        elapsed = time.perf_counter() - start
+        calls = repeats * len(samples)
+        results[name] = {'accuracy': correct / calls, 'latency_us': 1e6 * elapsed / calls}
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark local language identification against langdetect")
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    languages = ['en', 'es', 'fr', 'de', 'zh-cn', 'hi', 'ja', 'ru', 'ar', 'pt']
+    identifier = LanguageIdentifier(languages)
+    for label, samples in (('benchmark', BENCHMARK_SAMPLES), ('held-out', HELDOUT_SAMPLES)):
+        for name, result in benchmark(identifier, samples, repeats=args.repeats).items():
+            print(f"{label} {name}: {result}")
@@ -0,0 +1,100 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Collects work items submitted concurrently and processes them in batches
+
+    A background thread waits for the first item, keeps collecting until
+    `max_batch_size` items are queued or `max_wait_ms` has passed, then hands the
+    whole batch to `process_batch`, which must return one result per item.
+
+    The thread is started on first use, and again in a forked child process (threads
+    don't survive a fork), so a batcher can be created before workers are forked.
+    """
+
+    def __init__(self, process_batch, max_batch_size=32, max_wait_ms=5, name='micro-batcher'):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._lock = threading.Lock()
+        self._pid = None
+        self._stats = {
+            'batches': 0,
+            'items': 0,
+            'max_batch_size': 0,
+            'total_queue_delay_ms': 0.0,
+            'max_queue_delay_ms': 0.0,
+        }
+
+    def _ensure_worker(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, args=(self._queue,), name=self.name, daemon=True).start()
+                self._pid = os.getpid()
+
+    def submit(self, item):
+        """Queue an item, returns a Future resolved with its result"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item, timeout=None):
+        """Submit an item and wait for its result"""
+        return self.submit(item).result(timeout)
+
+    def _collect(self, work_queue):
+        batch = [work_queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(work_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, work_queue):
+        while True:
+            batch = self._collect(work_queue)
+            started = time.perf_counter()
+            self._record(len(batch), [1000 * (started - queued_at) for _, _, queued_at in batch])
+
+            items = [item for item, _, _ in batch]
+            try:
+                results = self.process_batch(items)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def _record(self, batch_size, delays_ms):
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['items'] += batch_size
+            self._stats['max_batch_size'] = max(self._stats['max_batch_size'], batch_size)
+            self._stats['total_queue_delay_ms'] += sum(delays_ms)
+            self._stats['max_queue_delay_ms'] = max(self._stats['max_queue_delay_ms'], max(delays_ms))
+
+    def stats(self):
+        """Batch size and queueing delay metrics"""
+        with self._lock:
+            stats = dict(self._stats)
+        total_delay_ms = stats.pop('total_queue_delay_ms')
+        stats['avg_batch_size'] = stats['items'] / stats['batches'] if stats['batches'] else 0.0
+        stats['avg_queue_delay_ms'] = total_delay_ms / stats['items'] if stats['items'] else 0.0
+        stats['queued'] = self._queue.qsize() if self._pid == os.getpid() else 0
+        return stats
@@ -0,0 +1,161 @@
+import os
+import threading
+from dotenv import load_dotenv
+from pymongo import MongoClient, monitoring
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
+
+# Load environment variables
+load_dotenv()
+
+# Connection string, required (set it in the environment or in .env)
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_DB = os.getenv("MONGO_DB", "test")
+
+# Connection pool and timeout settings of the shared client
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "2"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+# Read preference of reads that tolerate data a little behind the primary, e.g. the
+# recommenders' training data. Every other read goes to the primary, in particular the
+# index watermark and catalog signature reads that decide what changed
+MONGO_STALE_READ_PREFERENCE = os.getenv("MONGO_STALE_READ_PREFERENCE", "secondaryPreferred")
+# zlib needs no extra package; add zstd or snappy when python-zstandard / python-snappy are installed
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zlib")
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool utilization of the shared client"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connections_open = 0
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.checked_out = 0
+            self.max_checked_out = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.pool_clears = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+            self.connections_open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+            self.connections_open -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_pool_size': MONGO_MAX_POOL_SIZE,
+                'connections_open': self.connections_open,
+                'connections_created': self.connections_created,
+                'connections_closed': self.connections_closed,
+                'checked_out': self.checked_out,
+                'max_checked_out': self.max_checked_out,
+                'utilization': self.checked_out / MONGO_MAX_POOL_SIZE,
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'pool_clears': self.pool_clears,
+            }
+
+
+pool_metrics = PoolMetrics()
+_stale_read_preference = make_read_preference(read_pref_mode_from_name(MONGO_STALE_READ_PREFERENCE), None)
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    The process's MongoClient, created on first use
+
+    A client must not be used across fork(), so a forked worker gets its own.
+    The client connects lazily, on the first operation.
+    """
+    global _client, _client_pid
+    if _client_pid != os.getpid():
+        with _client_lock:
+            if _client_pid != os.getpid():
+                if not MONGO_URI:
+                    raise RuntimeError("MONGO_URI is not set; add the MongoDB connection string to the environment or .env")
+                if _client is not None:
+                    # Inherited from the parent; its sockets belong to the parent
+                    pool_metrics.reset()
+                _client = MongoClient(
+                    MONGO_URI,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                    compressors=MONGO_COMPRESSORS,
+                    event_listeners=[pool_metrics],
+                    connect=False,
+                )
+                _client_pid = os.getpid()
+    return _client
+
+
+def get_db():
+    return get_client()[MONGO_DB]
+
+
+def get_collection(name, stale_ok=False):
+    """
+    Args:
+        name (str): Collection name
+        stale_ok (bool): Let reads go to secondaries (MONGO_STALE_READ_PREFERENCE),
+            for callers that tolerate replication lag
+    """
+    if stale_ok:
+        return get_db().get_collection(name, read_preference=_stale_read_preference)
+    return get_db()[name]
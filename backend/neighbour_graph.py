@@ -0,0 +1,143 @@
+import multiprocessing
+import os
+import shutil
+import time
+import numpy as np
+from catalog_snapshot import StringColumn, decode_strings, encode_strings
+
+# Files written by NeighbourGraph.save
+GRAPH_ARRAYS = ('indptr', 'neighbours', 'scores')
+
+# Matrix (rows, and transposed) scored by a build worker, set by _init_worker()
+_matrix_rows = None
+_matrix_columns = None
+
+
+class NeighbourGraph:
+    """
+    The most similar products of every product, in CSR layout
+
+    The neighbours of row r are neighbours[indptr[r]:indptr[r + 1]] (int32 rows,
+    most similar first), with their similarities in the same slice of scores
+    (float16). Rows are named by product_ids. Every array is saved as its own .npy
+    file, so a loaded graph can stay memory-mapped and shared between processes.
+    """
+
+    def __init__(self, indptr, neighbours, scores, product_ids):
+        self.indptr = indptr
+        self.neighbours = neighbours
+        self.scores = scores
+        self.product_ids = product_ids
+        self._rows = {product_id: row for row, product_id in enumerate(product_ids)}
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def row(self, product_id):
+        """Row of a product, None if the graph doesn't have it"""
+        return self._rows.get(product_id)
+
+    def neighbours_of(self, row):
+        """(neighbour rows, similarities) of a row, most similar first"""
+        start, end = int(self.indptr[row]), int(self.indptr[row + 1])
+        return self.neighbours[start:end], self.scores[start:end]
+
+    def save(self, directory):
+        """Write the graph, replacing any graph saved in the directory once complete"""
+        staging = directory + '.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name in GRAPH_ARRAYS:
+            np.save(os.path.join(staging, f'{name}.npy'), getattr(self, name))
+        blob, offsets = encode_strings(self.product_ids)
+        np.save(os.path.join(staging, 'product_ids_blob.npy'), blob)
+        np.save(os.path.join(staging, 'product_ids_offsets.npy'), offsets)
+
+        # Processes that mapped the old files keep reading them until they reload
+        previous = directory + '.old'
+        if os.path.exists(directory):
+            shutil.rmtree(previous, ignore_errors=True)
+            os.rename(directory, previous)
+        os.rename(staging, directory)
+        shutil.rmtree(previous, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load a saved graph, memory-mapped read-only unless mmap=False"""
+        mmap_mode = 'r' if mmap else None
+        arrays = [np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode) for name in GRAPH_ARRAYS]
+        blob = np.load(os.path.join(directory, 'product_ids_blob.npy'), mmap_mode=mmap_mode)
+        offsets = np.load(os.path.join(directory, 'product_ids_offsets.npy'), mmap_mode=mmap_mode)
+        product_ids = StringColumn(blob, offsets) if mmap else decode_strings(blob, offsets)
+        return cls(*arrays, product_ids)
+
+
+def _init_worker(rows, columns):
+    global _matrix_rows, _matrix_columns
+    _matrix_rows, _matrix_columns = rows, columns
+
+
+def _chunk_neighbours(task):
+    """Top-k neighbours of the rows [start, end), as (start, counts, neighbours, scores)"""
+    start, end, k = task
+    similarities = (_matrix_rows[start:end] @ _matrix_columns).toarray()
+    # A product is not its own neighbour
+    similarities[np.arange(end - start), np.arange(start, end)] = 0
+
+    k = min(k, similarities.shape[1])
+    if k < similarities.shape[1]:
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    else:
+        top = np.tile(np.arange(similarities.shape[1]), (end - start, 1))
+    top_scores = np.take_along_axis(similarities, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    # Products sharing no term with the row are not neighbours
+    keep = top_scores > 0
+    return start, keep.sum(axis=1), top[keep].astype('int32'), top_scores[keep].astype('float16')
+
+
+def build_neighbour_graph(matrix, product_ids, k=50, chunk_size=256, processes=None):
+    """
+    Compute the k most similar rows of every row of an L2-normalized sparse matrix
+
+    Similarities are dot products (cosine similarities, given normalized rows),
+    computed one chunk of rows at a time so only chunk_size x N scores are held
+    per worker.
+
+    Args:
+        matrix: scipy.sparse matrix with one L2-normalized row per product
+        product_ids (list): Product ID of each row
+        k (int): Neighbours kept per product
+        chunk_size (int): Rows scored at once by a worker
+        processes (int): Worker processes, None for one per CPU, 1 to build in
+            this process
+
+    Returns:
+        NeighbourGraph: The graph
+    """
+    start_time = time.perf_counter()
+    rows = matrix.astype('float32').tocsr()
+    columns = rows.T.tocsr()
+    tasks = [(start, min(start + chunk_size, rows.shape[0]), k) for start in range(0, rows.shape[0], chunk_size)]
+
+    if processes == 1:
+        _init_worker(rows, columns)
+        chunks = [_chunk_neighbours(task) for task in tasks]
+    else:
+        # Forked workers inherit the matrix instead of unpickling a copy each
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        with context.Pool(processes, initializer=_init_worker, initargs=(rows, columns)) as pool:
+            chunks = sorted(pool.imap_unordered(_chunk_neighbours, tasks), key=lambda chunk: chunk[0])
+
+    counts = np.concatenate([chunk[1] for chunk in chunks]) if chunks else np.zeros(0, dtype='int64')
+    indptr = np.zeros(rows.shape[0] + 1, dtype='int64')
+    np.cumsum(counts, out=indptr[1:])
+    neighbours = np.concatenate([chunk[2] for chunk in chunks]) if chunks else np.zeros(0, dtype='int32')
+    scores = np.concatenate([chunk[3] for chunk in chunks]) if chunks else np.zeros(0, dtype='float16')
+    print(f"Neighbour graph built for {rows.shape[0]} products in {time.perf_counter() - start_time:.1f}s "
+          f"({len(tasks)} chunks, {len(neighbours)} neighbours)")
+    return NeighbourGraph(indptr, neighbours, scores, [str(product_id) for product_id in product_ids])
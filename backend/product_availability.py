@@ -1,16 +1,111 @@
-from pymongo import MongoClient
 import os
-from dotenv import load_dotenv
 import re
+import threading
+import time
+from intent_engine import analyze
+from mongo import get_collection
+from text_index import InvertedIndex, normalize_token, tokenize
 
-# Load environment variables
-load_dotenv()
+# Seconds between checks of whether the catalog changed since the index was built
+AVAILABILITY_REFRESH_SECONDS = float(os.getenv("AVAILABILITY_REFRESH_SECONDS", "60"))
 
-# MongoDB connection
-MONGO_URI = os.getenv("MONGO_URI")
-client = MongoClient(MONGO_URI)
-db = client["test"]
-products_collection = db["products"]
+# Product fields kept in memory to answer availability checks
+PRODUCT_FIELDS = {'title': 1, 'price': 1, 'rating': 1, 'category': 1, 'gender': 1}
+
+class AvailabilityIndex:
+    """
+    In-memory inverted index of the catalog for availability checks
+    
+    Products are indexed by title and category tokens (titles include colors) and by
+    gender, so a lookup intersects posting lists instead of scanning the collection
+    with a regex, and ranks the matches by BM25.
+    The index is rebuilt when the catalog changes: the product count and latest
+    `updatedAt` are checked at most every `refresh_seconds`, and refresh(force=True)
+    rebuilds it right away. Lookups only wait for the first build; later checks and
+    rebuilds run on a background thread while lookups keep using the current index.
+    Finding the latest `updatedAt` needs an index on it, which the first refresh
+    creates if it is missing.
+    """
+    
+    def __init__(self, refresh_seconds=AVAILABILITY_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.signature = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._refreshing = False  # Whether a background refresh is running, guarded by _refresh_lock
+        self._refresh_lock = threading.Lock()
+        self._updated_at_indexed = False
+        # (products by doc id, title/category index, gender index), swapped as a whole on rebuild
+        self._state = ([], InvertedIndex(), InvertedIndex())
+    
+    def catalog_signature(self):
+        collection = get_collection("products")
+        if not self._updated_at_indexed:
+            # Without it, the lookup below scans the whole collection
+            try:
+                collection.create_index('updatedAt')
+            except Exception as e:
+                print(f"Error creating the updatedAt index: {e}")
+            self._updated_at_indexed = True
+        latest = collection.find_one({}, {'updatedAt': 1}, sort=[('updatedAt', -1)])
+        return collection.estimated_document_count(), latest.get('updatedAt') if latest else None
+    
+    def refresh(self, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+                return
+            signature = self.catalog_signature()
+            self._checked_at = now
+            if signature == self.signature and not force:
+                return
+            
+            products, titles, genders = [], InvertedIndex(), InvertedIndex()
+            for doc_id, product in enumerate(get_collection("products").find({}, PRODUCT_FIELDS)):
+                products.append(product)
+                titles.add(doc_id, f"{product.get('title') or ''} {product.get('category') or ''}")
+                genders.add(doc_id, product.get('gender'))
+            self._state = (products, titles, genders)
+            self.signature = signature
+            print(f"Availability index built with {len(products)} products")
+    
+    def refresh_in_background(self):
+        """Start a refresh on a background thread when one is due and none is running"""
+        if self._checked_at is not None and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        try:
+            threading.Thread(target=self._background_refresh, name='availability-refresh', daemon=True).start()
+        except Exception as e:
+            print(f"Error starting availability index refresh: {e}")
+            with self._refresh_lock:
+                self._refreshing = False
+    
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Error refreshing availability index: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing = False
+    
+    def find(self, product_name, color=None, gender=None, limit=5):
+        """Best matching products with every word of the product name (and the color), for a gender"""
+        if self.signature is None:
+            # Nothing to serve before the first build
+            self.refresh()
+        else:
+            self.refresh_in_background()
+        products, titles, genders = self._state
+        tokens = tokenize(product_name) + (tokenize(color) if color else [])
+        within = genders.postings.get(normalize_token(gender), []) if gender else None
+        return [products[doc_id] for doc_id, _ in titles.search(tokens, k=limit, mode='and', within=within)]
+
+availability_index = AvailabilityIndex()
 
 def check_product_availability(query):
     """
@@ -32,18 +127,8 @@ def check_product_availability(query):
         if not product_name:
             return "I couldn't determine which product you're asking about. Could you specify the product name?"
         
-        # Build MongoDB query
-        mongo_query = {"title": {"$regex": product_name, "$options": "i"}}
-        
-        # Add optional filters if specified
-        if gender:
-            mongo_query["gender"] = {"$regex": gender, "$options": "i"}
-        
-        if color:
-            mongo_query["title"] = {"$regex": color, "$options": "i"}
-            
         # Find matching products
-        matching_products = list(products_collection.find(mongo_query).limit(5))
+        matching_products = availability_index.find(product_name, color, gender, limit=5)
         
         if not matching_products:
             return f"I'm sorry, I couldn't find any {product_name} in our inventory. Would you like to see similar products?"
@@ -51,11 +136,11 @@ def check_product_availability(query):
         # Format response based on results
         if len(matching_products) == 1:
             product = matching_products[0]
-            return f"Yes, we have {product['title']} available for {product['price']}. It has a rating of {product['rating'] or 'N/A'} and belongs to the {product['category']} category."
+            return f"Yes, we have {product.get('title')} available for {product.get('price')}. It has a rating of {product.get('rating') or 'N/A'} and belongs to the {product.get('category')} category."
         else:
             response = f"We have {len(matching_products)} types of {product_name} available:\n\n"
             for i, product in enumerate(matching_products, 1):
-                response += f"{i}. {product['title']} - {product['price']}\n"
+                response += f"{i}. {product.get('title')} - {product.get('price')}\n"
             
             response += "\nWould you like more details on any of these items?"
             return response
@@ -67,16 +152,13 @@ def check_product_availability(query):
 # Helper functions to extract information from query
 def extract_product_name(query):
     # Look for common product type words
-    product_types = ["shirt", "pants", "jeans", "dress", "top", "hoodie", "shoes", "sneakers", 
-                    "watch", "bag", "jacket", "sweater", "t-shirt", "tshirt", "socks"]
-    
-    for product in product_types:
-        if product in query.lower():
-            # Try to get a more specific name (e.g., "blue shirt" instead of just "shirt")
-            words_before = re.findall(r'(\w+)\s+' + product, query.lower())
-            if words_before:
-                return f"{words_before[-1]} {product}"
-            return product
+    product = analyze(query).first('product_type')
+    if product:
+        # Try to get a more specific name (e.g., "blue shirt" instead of just "shirt")
+        words_before = re.findall(r'(\w+)\s+' + re.escape(product), query.lower())
+        if words_before:
+            return f"{words_before[-1]} {product}"
+        return product
     
     # If no specific product type is found, try to find anything after "do you have" or similar phrases
     match = re.search(r'(?:do you have|is there|availability of|stock of|any)\s+(\w+(?:\s+\w+){0,3})', query.lower())
@@ -108,20 +190,14 @@ def extract_size(query):
 
 def extract_color(query):
     # Common colors
-    colors = ["black", "white", "red", "blue", "green", "yellow", "purple", "pink", 
-              "brown", "gray", "grey", "orange", "navy", "beige"]
-    
-    for color in colors:
-        if color in query.lower():
-            return color
-    
-    return None
+    return analyze(query).first('color')
 
 def extract_gender(query):
-    # Check for gender-specific terms
-    if any(term in query.lower() for term in ["men", "man", "male", "boy", "guys"]):
-        return "men"
-    elif any(term in query.lower() for term in ["women", "woman", "female", "girl", "ladies"]):
+    # Check for gender-specific terms ("women" contains "men", so check it first)
+    matches = analyze(query)
+    if matches.has('gender:women'):
         return "women"
+    elif matches.has('gender:men'):
+        return "men"
     
-    return None
\ No newline at end of file
+    return None
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
+from query_cache import LRUCache, normalize_query
+
+
+class ResponseCache:
+    """
+    Cache of generated responses with near-duplicate matching and request coalescing
+
+    Responses are keyed by (namespace, normalized query). A query that misses the
+    exact key can still be answered by a cached query whose embedding has at least
+    `similarity` cosine similarity, when an embedding function is set. Concurrent
+    computations of the same key share one call (single flight).
+
+    Args:
+        max_size (int): Responses kept before the least recently used is evicted
+        ttl (float): Seconds a response stays valid, None to keep it until evicted
+        similarity (float): Minimum cosine similarity for a near-duplicate match
+        embed_fn: `query -> embedding`, None for exact matching only
+    """
+
+    def __init__(self, max_size=2000, ttl=3600, similarity=0.95, embed_fn=None):
+        self.responses = LRUCache(max_size, ttl)
+        self.similarity = similarity
+        self.embed_fn = embed_fn
+        self._embeddings = {}  # Namespace -> OrderedDict of normalized query -> unit embedding
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.near_hits = 0
+        self.coalesced = 0
+
+    def lookup(self, namespace, query, semantic=True):
+        """Cached response for a query, None on a miss"""
+        key = (namespace, normalize_query(query))
+        response = self.responses.get(key)
+        if response is not None or not semantic or self.embed_fn is None:
+            return response
+        return self._lookup_similar(namespace, key[1])
+
+    def _lookup_similar(self, namespace, normalized):
+        with self._lock:
+            entries = self._embeddings.get(namespace)
+            if not entries:
+                return None
+            keys = list(entries)
+            matrix = np.stack(list(entries.values()))
+        embedding = self._unit_embedding(normalized)
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity:
+            return None
+
+        response = self.responses.get((namespace, keys[best]))
+        if response is None:
+            # Expired or evicted since
+            with self._lock:
+                entries.pop(keys[best], None)
+            return None
+        self.near_hits += 1
+        return response
+
+    def _unit_embedding(self, normalized):
+        embedding = np.asarray(self.embed_fn(normalized), dtype='float32')
+        return embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+
+    def store(self, namespace, query, response, semantic=True):
+        normalized = normalize_query(query)
+        self.responses.set((namespace, normalized), response)
+        if not semantic or self.embed_fn is None:
+            return
+        embedding = self._unit_embedding(normalized)
+        with self._lock:
+            entries = self._embeddings.setdefault(namespace, OrderedDict())
+            entries[normalized] = embedding
+            entries.move_to_end(normalized)
+            while len(entries) > self.responses.max_size:
+                entries.popitem(last=False)
+
+    def get_or_compute(self, namespace, query, compute_fn):
+        """
+        Cached response for a query, or compute_fn() stored as its response
+
+        Concurrent calls for the same key wait for the first one's compute_fn()
+        instead of calling their own. If compute_fn() raises, every waiting caller
+        gets the exception and nothing is cached.
+        """
+        response = self.lookup(namespace, query)
+        if response is not None:
+            return response
+
+        key = (namespace, normalize_query(query))
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+
+        try:
+            response = compute_fn()
+            self.store(namespace, query, response)
+            future.set_result(response)
+            return response
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    async def get_or_compute_async(self, namespace, query, compute_coro_fn):
+        """
+        get_or_compute() for coroutines, matching exact keys only
+
+        Near-duplicate matching is skipped, since embedding the query would block
+        the event loop.
+        """
+        response = self.lookup(namespace, query, semantic=False)
+        if response is not None:
+            return response
+
+        key = ('async', namespace, normalize_query(query))
+        with self._lock:
+            task = self._in_flight.get(key)
+            if task is None:
+                task = self._in_flight[key] = asyncio.ensure_future(compute_coro_fn())
+                task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            else:
+                self.coalesced += 1
+        response = await asyncio.shield(task)
+        self.store(namespace, query, response, semantic=False)
+        return response
+
+    def stats(self):
+        return {**self.responses.stats(), 'near_hits': self.near_hits, 'coalesced': self.coalesced}
@@ -0,0 +1,74 @@
+import numpy as np
+
+# Example messages for each chatbot route, averaged into one centroid per route
+INTENT_EXAMPLES = {
+    'availability': [
+        "do you have this shirt in stock",
+        "is the blue hoodie available in size M",
+        "do you sell leather bags",
+        "are black sneakers available for men",
+        "check availability of red dresses",
+    ],
+    'product_search': [
+        "show me white sneakers under 2000",
+        "I am looking for a formal shirt",
+        "find jeans with good reviews",
+        "search for women's jackets rated above 4",
+        "I want to buy a sports watch",
+    ],
+    'fashion_advice': [
+        "what should I wear to a wedding",
+        "how do I style a denim jacket",
+        "which colors go well with navy trousers",
+        "what outfits are trending this summer",
+        "give me tips for a date night look",
+    ],
+    'faq': [
+        "what is your return policy",
+        "how long does shipping take",
+        "how can I track my order",
+        "which payment methods do you accept",
+        "can I exchange an item",
+    ],
+    'general': [
+        "hello there",
+        "who are you",
+        "tell me about ShopMart",
+        "thank you for your help",
+        "can I talk to a human",
+    ],
+}
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype='float32')
+    return vectors / np.clip(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12, None)
+
+
+class SemanticRouter:
+    """
+    Routes a message by the cosine similarity of its embedding to per-route centroids
+
+    Args:
+        encode_fn: `texts -> embeddings`, the sentence encoder used for search
+        examples (dict): Route name -> example messages
+        threshold (float): Minimum similarity to the best centroid; below it
+            route() returns None so the caller can fall back to keyword routing
+    """
+
+    def __init__(self, encode_fn, examples=INTENT_EXAMPLES, threshold=0.4):
+        self.routes = list(examples)
+        self.threshold = threshold
+        self.centroids = normalize_rows([normalize_rows(encode_fn(examples[route])).mean(axis=0)
+                                         for route in self.routes])
+
+    def route(self, embedding):
+        """
+        Returns:
+            tuple: (route name or None when not confident, best similarity)
+        """
+        similarities = self.centroids @ normalize_rows(embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None, float(similarities[best])
+        return self.routes[best], float(similarities[best])
@@ -0,0 +1,22 @@
+import os
+import sys
+import pytest
+
+# Backend modules are imported by their plain names, as app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """gemini_handler answering from a FakeGeminiModel, with its own cache and breaker"""
+    pytest.importorskip('google.generativeai')
+    monkeypatch.setenv('GEMINI_FAKE', '1')
+    import gemini_handler
+    from circuit_breaker import CircuitBreaker
+    from fake_llm import FakeGeminiModel
+    from response_cache import ResponseCache
+
+    monkeypatch.setattr(gemini_handler, 'model', FakeGeminiModel())
+    monkeypatch.setattr(gemini_handler, 'response_cache', ResponseCache(max_size=100, ttl=None))
+    monkeypatch.setattr(gemini_handler, 'breaker', CircuitBreaker(failure_threshold=2, reset_timeout=0.2))
+    return gemini_handler
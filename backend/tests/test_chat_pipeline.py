@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+import pytest
+from fake_llm import FakeGeminiModel
+
+
+@pytest.fixture
+def backend(gemini, monkeypatch):
+    pytest.importorskip('quart')
+    pytest.importorskip('googletrans')
+    import app as backend
+
+    monkeypatch.setattr(backend, 'detect_language', lambda text: 'es' if text.startswith('¿') else 'en')
+    monkeypatch.setattr(backend, 'classify_message', lambda text: 'general')
+    return backend
+
+
+def make_pipeline(**kwargs):
+    from asgi_app import ChatPipeline
+    kwargs.setdefault('translate_fn', lambda text, src, dest: f"[{dest}] {text}")
+    kwargs.setdefault('llm', FakeGeminiModel(lambda prompt: "Linen shirts."))
+    return ChatPipeline(**kwargs)
+
+
+def test_answers_through_the_llm_and_translates_back(backend):
+    pipeline = make_pipeline()
+
+    assert asyncio.run(pipeline.answer("¿Qué me pongo?")) == ("[es] Linen shirts.", 'es')
+    assert asyncio.run(pipeline.answer("What should I wear?")) == ("Linen shirts.", 'en')
+
+
+def test_async_translate_fn_is_awaited(backend):
+    async def translate(text, src, dest):
+        await asyncio.sleep(0)
+        return f"<{dest}> {text}"
+
+    assert asyncio.run(make_pipeline(translate_fn=translate).answer("¿Qué me pongo?")) == ("<es> Linen shirts.", 'es')
+
+
+def test_slow_translation_keeps_the_untranslated_text(backend):
+    def translate(text, src, dest):
+        time.sleep(0.3)
+        return "too late"
+
+    pipeline = make_pipeline(translate_fn=translate, translate_timeout=0.05)
+    assert asyncio.run(pipeline.answer("¿Qué me pongo?")) == ("Linen shirts.", 'es')
+
+
+def test_slow_llm_answers_with_the_fallback(backend):
+    pipeline = make_pipeline(llm=FakeGeminiModel("Linen shirts.", delay=0.3), llm_timeout=0.05)
+
+    assert asyncio.run(pipeline.answer("What should I wear?")) == (backend.GENERAL_FALLBACK, 'en')
+
+
+def test_conversations_run_concurrently(backend):
+    pipeline = make_pipeline(llm=FakeGeminiModel(lambda prompt: "Linen shirts.", delay=0.2))
+
+    async def main():
+        return await asyncio.gather(*[pipeline.answer(f"What should I wear on day {day}?") for day in range(5)])
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    assert results == [("Linen shirts.", 'en')] * 5
+    assert time.perf_counter() - started < 0.6
+
+
+def test_blocking_steps_run_off_the_event_loop(backend, monkeypatch):
+    loop_thread = threading.get_ident()
+    threads = []
+
+    def classify(text):
+        threads.append(threading.get_ident())
+        return 'faq'
+
+    def answer(text, route):
+        threads.append(threading.get_ident())
+        time.sleep(0.2)
+        return "Returns are free."
+
+    monkeypatch.setattr(backend, 'classify_message', classify)
+    monkeypatch.setattr(backend, 'answer_message', answer)
+    pipeline = make_pipeline()
+
+    async def main():
+        return await asyncio.gather(*[pipeline.answer("How do returns work?") for _ in range(3)])
+
+    started = time.perf_counter()
+    assert asyncio.run(main()) == [("Returns are free.", 'en')] * 3
+    assert time.perf_counter() - started < 0.5
+    assert loop_thread not in threads
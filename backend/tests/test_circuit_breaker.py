@@ -0,0 +1,120 @@
+import time
+import pytest
+from circuit_breaker import CircuitBreaker
+from fake_llm import FakeGeminiModel
+
+RESET_TIMEOUT = 0.05
+
+
+def failing_reply(prompt):
+    raise RuntimeError("503 Service Unavailable")
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker(failure_threshold=3, reset_timeout=RESET_TIMEOUT)
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_success()
+
+    open_breaker(breaker)
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.stats()['times_opened'] == 1
+
+
+def test_half_open_lets_a_single_trial_through(breaker):
+    open_breaker(breaker)
+    time.sleep(RESET_TIMEOUT)
+
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()
+
+
+def test_successful_trial_closes(breaker):
+    open_breaker(breaker)
+    time.sleep(RESET_TIMEOUT)
+    breaker.allow()
+    breaker.record_success()
+
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+
+
+def test_failed_trial_opens_again(breaker):
+    open_breaker(breaker)
+    time.sleep(RESET_TIMEOUT)
+    breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.stats()['times_opened'] == 2
+
+
+def test_released_trial_goes_to_the_next_caller(breaker):
+    open_breaker(breaker)
+    time.sleep(RESET_TIMEOUT)
+    breaker.allow()
+    breaker.release()
+
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_abandoned_trial_is_replaced(breaker):
+    open_breaker(breaker)
+    time.sleep(RESET_TIMEOUT)
+    breaker.allow()
+    time.sleep(RESET_TIMEOUT)
+
+    assert breaker.allow()
+
+
+def test_gemini_short_circuits_and_recovers(gemini, monkeypatch):
+    monkeypatch.setattr(gemini, 'model', FakeGeminiModel(failing_reply))
+    for _ in range(gemini.breaker.failure_threshold):
+        assert gemini.get_gemini_response("summer trends", 'general') == gemini.GENERAL_FALLBACK
+    assert gemini.breaker.state == 'open'
+
+    # Open: answered locally without calling the model
+    calls = gemini.model.calls
+    assert gemini.get_gemini_response("summer trends", 'general') == gemini.GENERAL_FALLBACK
+    assert gemini.model.calls == calls
+
+    # Half-open: the trial call reaches the (recovered) model and closes the breaker
+    time.sleep(gemini.breaker.reset_timeout)
+    monkeypatch.setattr(gemini, 'model', FakeGeminiModel("Linen shirts."))
+    assert gemini.get_gemini_response("summer trends", 'general') == "Linen shirts."
+    assert gemini.breaker.state == 'closed'
+
+
+def test_stalled_stream_falls_back(gemini, monkeypatch):
+    monkeypatch.setattr(gemini, 'GEMINI_STREAM_CHUNK_TIMEOUT_MS', 50)
+    monkeypatch.setattr(gemini, 'model', FakeGeminiModel("Linen shirts.", delay=0.5))
+
+    assert list(gemini.stream_gemini_response("summer trends", 'general')) == [gemini.GENERAL_FALLBACK]
+    assert gemini.breaker.consecutive_failures == 1
+
+
+def test_slow_call_is_hedged_and_cached(gemini, monkeypatch):
+    monkeypatch.setattr(gemini, 'GEMINI_HEDGE_MS', 50)
+    monkeypatch.setattr(gemini, 'model', FakeGeminiModel("Linen shirts.", delay=0.2))
+
+    assert gemini.get_gemini_response("summer trends", 'general') == gemini.GENERAL_FALLBACK
+    time.sleep(0.3)
+    assert gemini.get_gemini_response("summer trends", 'general') == "Linen shirts."
+    assert gemini.model.calls == 1
@@ -0,0 +1,134 @@
+import random
+import numpy as np
+import pytest
+from sklearn.metrics.pairwise import cosine_similarity
+
+COLORS = ['red', 'blue', 'black', 'white']
+TYPES = ['shirt', 'dress', 'jeans', 'jacket', 'kurta', 'saree']
+GENDERS = ['men', 'women', 'unisex']
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, query=None, projection=None):
+        return [dict(document) for document in self.documents]
+
+
+def small_catalog(count=120, seed=0):
+    rng = random.Random(seed)
+    products = [{
+        '_id': f"p{i:03d}",
+        'title': f"{rng.choice(COLORS)} {rng.choice(TYPES)} {rng.choice(['classic', 'slim', 'cotton', 'silk'])}",
+        'category': rng.choice(['Topwear', 'Bottomwear', 'Ethnic']),
+        'gender': rng.choice(GENDERS),
+        'reviews': rng.choice(['good quality', 'runs small', 'great fit', '']),
+        'price': rng.randint(300, 3000),
+        'rating': round(rng.uniform(1, 5), 1),
+    } for i in range(count)]
+    interactions = [{'userId': 'u1', 'productId': products[i]['_id'], 'action': 'purchase'} for i in (3, 17)]
+    return products, interactions
+
+
+@pytest.fixture(scope='module')
+def content_based(tmp_path_factory):
+    products, interactions = small_catalog()
+    collections = {'products': FakeCollection(products), 'interactions': FakeCollection(interactions)}
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        import mongo
+        # contentBased loads its data when imported
+        monkeypatch.setattr(mongo, 'get_collection', lambda name, stale_ok=False: collections[name])
+        import contentBased
+        monkeypatch.setattr(contentBased, 'get_collection', lambda name, stale_ok=False: collections[name])
+        monkeypatch.setattr(contentBased, 'NEIGHBOUR_GRAPH_PATH', str(tmp_path_factory.mktemp('graph') / 'missing'))
+        monkeypatch.setattr(contentBased, 'neighbour_graph', None)
+        assert contentBased.load_data()
+        yield contentBased
+
+
+@pytest.fixture(scope='module')
+def dense_similarity(content_based):
+    # The N x N matrix the recommender used to precompute
+    return cosine_similarity(content_based.tfidf_matrix, content_based.tfidf_matrix)
+
+
+def test_similarity_scores_match_the_dense_matrix(content_based, dense_similarity):
+    for position in range(len(dense_similarity)):
+        np.testing.assert_allclose(content_based.similarity_scores([position]), dense_similarity[position], atol=1e-6)
+
+
+def test_scores_of_several_products_are_summed(content_based, dense_similarity):
+    positions = [3, 17, 42]
+
+    np.testing.assert_allclose(content_based.similarity_scores(positions),
+                               dense_similarity[positions].sum(axis=0), atol=1e-6)
+
+
+def test_top_positions_match_a_full_sort(content_based, dense_similarity):
+    scores = content_based.similarity_scores([5])
+    scores[5] = -np.inf
+
+    top = content_based.top_positions(scores, 10)
+    expected = np.argsort(-np.where(np.arange(len(scores)) == 5, -np.inf, dense_similarity[5]), kind='stable')[:10]
+    np.testing.assert_allclose(scores[top], dense_similarity[5][expected], atol=1e-6)
+    assert 5 not in top
+
+
+def test_top_positions_among_candidates(content_based):
+    scores = content_based.similarity_scores([5])
+    candidates = content_based.gender_mask('women')
+
+    top = content_based.top_positions(scores, 8, candidates)
+    assert candidates[top].all()
+    assert list(scores[top]) == sorted(scores[top], reverse=True)
+    assert scores[top][-1] >= scores[candidates & ~np.isin(np.arange(len(scores)), top)].max()
+
+
+def old_similar_products(content_based, dense_similarity, position, top_n):
+    """The dense-matrix ranking: most similar first, same gender or unisex when the product has one"""
+    order = [other for other in np.argsort(-dense_similarity[position], kind='stable') if other != position]
+    gender = content_based.product_genders[position]
+    if gender not in ('unknown', 'unisex'):
+        order = [other for other in order if content_based.product_genders[other] in (gender, 'unisex')]
+    return [float(dense_similarity[position][other]) for other in order[:top_n]]
+
+
+@pytest.mark.parametrize('position', [0, 7, 33, 90])
+def test_similar_products_match_the_dense_ranking(content_based, dense_similarity, position):
+    product_id = content_based.df_products['_id'].iloc[position]
+    products = content_based.recommend_similar_products(product_id, top_n=5)['products']
+
+    scores = [product['similarity_score'] for product in products]
+    assert scores == pytest.approx(old_similar_products(content_based, dense_similarity, position, 5), abs=1e-6)
+
+
+@pytest.fixture
+def with_graph(content_based, monkeypatch):
+    from neighbour_graph import build_neighbour_graph
+
+    def use_graph(k):
+        graph = build_neighbour_graph(content_based.tfidf_matrix, content_based.df_products['_id'], k=k, processes=1)
+        monkeypatch.setattr(content_based, 'neighbour_graph', graph)
+        return graph
+    return use_graph
+
+
+@pytest.mark.parametrize('position', [0, 7, 33, 90])
+def test_graph_neighbours_match_the_dense_ranking(content_based, dense_similarity, with_graph, position):
+    with_graph(k=30)
+    product_id = content_based.df_products['_id'].iloc[position]
+    products = content_based.recommend_similar_products(product_id, top_n=5)['products']
+
+    # Graph scores are float16
+    scores = [product['similarity_score'] for product in products]
+    assert scores == pytest.approx(old_similar_products(content_based, dense_similarity, position, 5), abs=1e-3)
+
+
+def test_too_few_graph_neighbours_are_scored_on_demand(content_based, dense_similarity, with_graph):
+    with_graph(k=3)
+    product_id = content_based.df_products['_id'].iloc[7]
+    products = content_based.recommend_similar_products(product_id, top_n=8)['products']
+
+    scores = [product['similarity_score'] for product in products]
+    assert scores == pytest.approx(old_similar_products(content_based, dense_similarity, 7, 8), abs=1e-6)
@@ -0,0 +1,171 @@
+import numpy as np
+import pytest
+from ann_index import INDEX_TYPES, create_index, filtered_search
+
+DIMENSION = 32
+N_VECTORS = 3000
+
+
+@pytest.fixture(scope='module')
+def vectors():
+    return np.random.default_rng(0).standard_normal((N_VECTORS, DIMENSION)).astype('float32')
+
+
+@pytest.fixture(scope='module')
+def queries():
+    return np.random.default_rng(1).standard_normal((8, DIMENSION)).astype('float32')
+
+
+@pytest.fixture(scope='module', params=INDEX_TYPES)
+def index(request, vectors):
+    index, index_type = create_index(request.param, DIMENSION, vectors)
+    assert index_type == request.param
+    index.add_with_ids(vectors, np.arange(N_VECTORS, dtype='int64'))
+    return index, index_type
+
+
+def brute_force(vectors, queries, mask, k):
+    allowed = np.flatnonzero(mask)
+    distances = ((queries[:, None, :] - vectors[allowed][None, :, :]) ** 2).sum(axis=2)
+    return [allowed[np.argsort(row, kind='stable')[:k]].tolist() for row in distances]
+
+
+def test_restrictive_mask_returns_every_allowed_id(index, queries):
+    mask = np.zeros(N_VECTORS, dtype=bool)
+    mask[[7, 1500, 2999]] = True
+
+    for ids in filtered_search(*index, queries, mask, k=5):
+        assert sorted(ids) == [7, 1500, 2999]
+
+
+@pytest.mark.parametrize('allowed', [10, 100, 1500])
+def test_results_stay_inside_the_mask(index, queries, allowed):
+    mask = np.zeros(N_VECTORS, dtype=bool)
+    mask[np.random.default_rng(allowed).choice(N_VECTORS, allowed, replace=False)] = True
+
+    for ids in filtered_search(*index, queries, mask, k=10):
+        assert len(ids) == 10
+        assert len(set(ids)) == 10
+        assert mask[ids].all()
+
+
+@pytest.mark.parametrize('allowed', [3, 50, 3000])
+def test_flat_index_matches_brute_force(vectors, queries, allowed):
+    index = create_index('flat', DIMENSION, vectors)
+    index[0].add_with_ids(vectors, np.arange(N_VECTORS, dtype='int64'))
+    mask = np.zeros(N_VECTORS, dtype=bool)
+    mask[np.random.default_rng(allowed).choice(N_VECTORS, allowed, replace=False)] = True
+
+    assert filtered_search(*index, queries, mask, k=10) == brute_force(vectors, queries, mask, 10)
+
+
+def test_empty_mask(index, queries):
+    assert filtered_search(*index, queries, np.zeros(N_VECTORS, dtype=bool), k=5) == [[]] * len(queries)
+
+
+CATEGORIES = ['Shirts', 'T-Shirts', 'Jeans', 'Dresses']
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    from catalog_snapshot import CatalogSnapshot
+    rng = np.random.default_rng(2)
+    products = [{
+        'title': f"Product {i}",
+        'price': f"₹{int(rng.integers(100, 5000)):,}" if i % 50 else 'call us',
+        'rating': round(float(rng.uniform(1, 5)), 1) if i % 40 else None,
+        'category': CATEGORIES[i % len(CATEGORIES)],
+        'reviews': 'Good fit' if i % 3 == 0 else 'Runs small',
+    } for i in range(N_VECTORS)]
+    snapshot = CatalogSnapshot()
+    snapshot.set(np.arange(N_VECTORS, dtype='int64'), products)
+    return snapshot
+
+
+@pytest.mark.parametrize('constraints', [
+    (1000, None, None, False), (None, 4.0, None, False), (None, None, 'shirts', False),
+    (None, None, None, True), (800, 4.5, 'jeans', True),
+])
+def test_allowed_mask_applies_every_constraint(catalog, constraints):
+    max_price, min_rating, category, good_reviews = constraints
+    mask = catalog.allowed_mask(*constraints)
+
+    assert mask.any()
+    for faiss_id in range(N_VECTORS):
+        expected = (
+            (not max_price or not catalog.prices[faiss_id] > max_price)
+            and (not min_rating or not catalog.ratings[faiss_id] < min_rating)
+            and (not good_reviews or catalog.good_reviews[faiss_id])
+            and (not category or category in catalog.category_names[catalog.category_codes[faiss_id]].lower())
+        )
+        assert mask[faiss_id] == expected
+
+
+def test_allowed_mask_keeps_unparseable_fields_and_drops_removed_products(catalog):
+    mask = catalog.allowed_mask(max_price=1000, min_rating=4.0)
+    assert mask[0] and np.isnan(catalog.prices[0]) and np.isnan(catalog.ratings[0])
+
+    catalog.remove([0])
+    try:
+        assert not catalog.allowed_mask(max_price=1000, min_rating=4.0)[0]
+    finally:
+        catalog.valid[0] = True
+
+
+@pytest.fixture
+def backend(monkeypatch, vectors, catalog):
+    pytest.importorskip('google.generativeai')
+    pytest.importorskip('googletrans')
+    import app as backend
+
+    index, index_type = create_index('ivf', DIMENSION, vectors)
+    index.add_with_ids(vectors, np.arange(N_VECTORS, dtype='int64'))
+    monkeypatch.setattr(backend, 'index', index)
+    monkeypatch.setattr(backend, 'active_index_type', index_type)
+    monkeypatch.setattr(backend, 'catalog', catalog)
+    monkeypatch.setattr(backend, 'product_ids', {faiss_id: str(faiss_id) for faiss_id in range(N_VECTORS)})
+    monkeypatch.setattr(backend, 'SEARCH_MODE', 'semantic')
+    return backend
+
+
+def test_search_groups_only_returns_matching_products(backend, catalog, queries):
+    requests = [(f"query {i}", constraints) for i, constraints in enumerate([
+        (800, 4.5, 'jeans', True), (800, 4.5, 'jeans', True), (None, None, 'dresses', False), (200, None, None, False),
+    ])]
+    groups = {}
+    for position, (_, constraints) in enumerate(requests):
+        groups.setdefault(constraints, []).append(position)
+
+    results = backend.search_groups(requests, queries[:len(requests)], groups)
+
+    titles = {title: faiss_id for faiss_id, title in enumerate(catalog.titles)}
+    for (_, constraints), products in zip(requests, results):
+        mask = catalog.allowed_mask(*constraints)
+        assert len(products) == min(backend.SEARCH_RESULTS, int(mask.sum()))
+        assert all(mask[titles[product['title']]] for product in products)
+
+
+@pytest.mark.parametrize('constraints', [(None, None, None, False), (1000, None, 'shirts', False)])
+def test_lexical_search_only_returns_allowed_products(backend, monkeypatch, constraints):
+    from catalog_snapshot import CatalogSnapshot
+    from text_index import InvertedIndex, tokenize
+    snapshot = CatalogSnapshot()
+    snapshot.set(np.arange(200, dtype='int64'), [{
+        'title': f"blue cotton shirt {i}" if i % 2 else f"red shirt {i}",
+        'category': CATEGORIES[i % len(CATEGORIES)],
+        'price': f"₹{500 + 10 * i}",
+    } for i in range(200)])
+    lexical_index = backend.build_lexical_index(snapshot)
+    # Removed products stay in the lexical index until the next rebuild
+    snapshot.remove(list(range(1, 120, 2)))
+    monkeypatch.setattr(backend, 'catalog', snapshot)
+    monkeypatch.setattr(backend, 'lexical_index', lexical_index)
+    monkeypatch.setattr(backend, 'HYBRID_CANDIDATES', 20)
+    mask = snapshot.allowed_mask(*constraints)
+
+    queries = ["blue cotton shirt", "red shirts", "dresses"]
+    within = np.flatnonzero(mask).tolist()
+    expected = [[faiss_id for faiss_id, _ in lexical_index.search(tokenize(query), k=20, mode='or', within=within)]
+                for query in queries]
+    assert backend.search_lexical(queries, mask) == expected
+    assert expected[0] and all(mask[ids].all() for ids in expected)
@@ -0,0 +1,73 @@
+import json
+import math
+import numpy as np
+import pytest
+from hybrid_search import BENCHMARK_PATH, benchmark, reciprocal_rank_fusion, relevance_metrics
+
+
+def test_ids_ranked_high_by_both_lists_come_first():
+    semantic = ['a', 'b', 'c', 'd']
+    lexical = ['c', 'a', 'e']
+
+    # a: 1/61 + 1/62, c: 1/63 + 1/61, b: 1/62, e: 1/63, d: 1/64
+    assert reciprocal_rank_fusion([semantic, lexical]) == ['a', 'c', 'b', 'e', 'd']
+
+
+def test_fused_scores_follow_the_formula():
+    rankings = [['x', 'y', 'z'], ['z', 'y'], ['y']]
+    weights = [1.0, 2.0, 0.5]
+    k = 10
+
+    expected = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, 1):
+            expected[doc_id] = expected.get(doc_id, 0.0) + weight / (k + rank)
+    assert reciprocal_rank_fusion(rankings, weights, k) == sorted(expected, key=expected.get, reverse=True)
+
+
+def test_weights_favour_a_list():
+    semantic = ['a', 'b']
+    lexical = ['b', 'a']
+
+    assert reciprocal_rank_fusion([semantic, lexical], [2.0, 1.0]) == ['a', 'b']
+    assert reciprocal_rank_fusion([semantic, lexical], [1.0, 2.0]) == ['b', 'a']
+
+
+def test_ties_keep_first_seen_order_and_limit():
+    assert reciprocal_rank_fusion([['a', 'b'], ['b', 'a']]) == ['a', 'b']
+    assert reciprocal_rank_fusion([['a', 'b', 'c'], ['d']], limit=2) == ['a', 'd']
+    assert reciprocal_rank_fusion([[], []]) == []
+
+
+def test_relevance_metrics():
+    metrics = relevance_metrics(['x', 'a', 'y', 'b'], {'a', 'b'}, k=3)
+
+    assert metrics['recall'] == 0.5
+    assert metrics['mrr'] == 0.5
+    assert metrics['ndcg'] == pytest.approx((1 / math.log2(3)) / (1 + 1 / math.log2(3)))
+    assert relevance_metrics(['x'], {'a'}, k=3) == {'recall': 0.0, 'mrr': 0.0, 'ndcg': 0.0}
+
+
+def hashed_bag_of_words(texts, dimension=256):
+    """Deterministic stand-in encoder: L2-normalized hashed word counts"""
+    vectors = np.zeros((len(texts), dimension), dtype='float32')
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            vectors[row, sum(map(ord, word)) % dimension] += 1
+    return vectors
+
+
+def test_benchmark_reports_every_mode():
+    with open(BENCHMARK_PATH) as f:
+        data = json.load(f)
+
+    report = benchmark(data['products'], data['queries'], hashed_bag_of_words, k=5,
+                       weight_grid=((1.0, 1.0), (1.0, 2.0)))
+
+    assert set(report) == {'semantic', 'lexical', 'hybrid(1,1)', 'hybrid(1,2)'}
+    for result in report.values():
+        assert 0.0 <= result['recall@5'] <= 1.0
+        assert 0.0 <= result['ndcg@5'] <= 1.0
+        assert result['p95_ms'] >= 0.0
+    # Exact titles are easy for BM25
+    assert report['lexical']['mrr@5'] > 0.5
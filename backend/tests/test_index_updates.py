@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from bson.objectid import ObjectId
+from catalog_snapshot import CatalogSnapshot
+
+DIMENSION = 256
+# Products are usually imported in bulk, so many share one timestamp
+IMPORTED_AT = datetime(2024, 1, 1)
+
+
+class HashedEncoder:
+    """Deterministic stand-in for the sentence encoder, counting the texts it encodes"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts):
+        self.encoded.extend(texts)
+        vectors = np.zeros((len(texts), DIMENSION), dtype='float32')
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, sum(map(ord, word)) % DIMENSION] += 1
+        return vectors
+
+
+def matches(product, query):
+    for field, condition in query.items():
+        if field == '$or':
+            if not any(matches(product, part) for part in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = product.get(field)
+            if '$gt' in condition and not (value is not None and value > condition['$gt']):
+                return False
+            if '$in' in condition and value not in condition['$in']:
+                return False
+            if '$nin' in condition and value in condition['$nin']:
+                return False
+        elif product.get(field) != condition:
+            return False
+    return True
+
+
+class FakeProducts:
+    """Products collection answering the queries the index updates make"""
+
+    def __init__(self, products):
+        self.products = products
+
+    def find(self, query=None, projection=None):
+        return [dict(product) for product in self.products if matches(product, query or {})]
+
+
+def product(title, updated_at=IMPORTED_AT):
+    return {'_id': ObjectId(), 'title': title, 'category': 'Topwear', 'price': '₹999', 'rating': 4.2,
+            'updatedAt': updated_at}
+
+
+@pytest.fixture
+def collection():
+    return FakeProducts([product(f"shirt {i}") for i in range(200)])
+
+
+@pytest.fixture
+def encoder():
+    return HashedEncoder()
+
+
+@pytest.fixture
+def backend(monkeypatch, tmp_path, collection, encoder):
+    pytest.importorskip('google.generativeai')
+    pytest.importorskip('googletrans')
+    import app as backend
+    from embedding_store import EmbeddingStore
+
+    monkeypatch.setattr(backend, 'products_collection', lambda: collection)
+    monkeypatch.setattr(backend, 'get_model', lambda: encoder)
+    monkeypatch.setattr(backend, 'embedding_size', DIMENSION)
+    monkeypatch.setattr(backend, 'embedding_store', EmbeddingStore(str(tmp_path / 'embeddings'), 'hashed', DIMENSION))
+    monkeypatch.setattr(backend, 'INDEX_DIR', str(tmp_path))
+    monkeypatch.setattr(backend, 'INDEX_META_PATH', str(tmp_path / 'products_index.json'))
+    monkeypatch.setattr(backend, 'INDEX_TYPE', 'flat')
+    monkeypatch.setattr(backend, 'SHARED_INDEX', False)
+    monkeypatch.setattr(backend, 'SEARCH_MODE', 'semantic')
+    for name in ('index', 'active_index_type', 'product_ids', 'faiss_ids', 'next_faiss_id', 'index_watermark',
+                 'index_watermark_ids', 'catalog', 'lexical_index', 'index_generation', 'index_mapped',
+                 'index_meta_mtime', 'index_version', '_index_checked_at'):
+        # Restored after the test
+        monkeypatch.setattr(backend, name, getattr(backend, name))
+    return backend
+
+
+def indexed_titles(backend):
+    return sorted(backend.catalog.titles[faiss_id] for faiss_id in backend.product_ids)
+
+
+def test_incremental_update_adds_updates_and_removes(backend, collection, encoder):
+    products = collection.products
+    assert backend.update_faiss_index()['total'] == 200
+
+    later = IMPORTED_AT + timedelta(minutes=5)
+    products[0].update(title='linen shirt', updatedAt=later)
+    removed = products.pop(1)
+    products.append(product('denim jacket', later))
+    encoder.encoded.clear()
+
+    summary = backend.update_faiss_index(incremental=True)
+
+    assert summary == {'mode': 'incremental', 'added': 1, 'updated': 1, 'removed': 1, 'total': 200}
+    assert indexed_titles(backend) == sorted(p['title'] for p in products)
+    assert str(removed['_id']) not in backend.faiss_ids
+    assert len(encoder.encoded) == 2
+    # Searches see the new products
+    results = backend.search_products_batch([('denim jacket', (None, None, None, False))])[0]
+    assert results[0]['title'] == 'denim jacket'
+
+
+def test_products_sharing_the_watermark_are_not_updated_again(backend, collection):
+    products = collection.products
+    backend.update_faiss_index()
+
+    # A product written at the watermark after the last update is still picked up
+    products.append(product('silk scarf'))
+    assert backend.update_faiss_index(incremental=True) == {
+        'mode': 'incremental', 'added': 1, 'updated': 0, 'removed': 0, 'total': 201}
+
+    products[5].update(title='polo shirt', updatedAt=IMPORTED_AT + timedelta(seconds=1))
+    assert backend.update_faiss_index(incremental=True) == {
+        'mode': 'incremental', 'added': 0, 'updated': 1, 'removed': 0, 'total': 201}
+    assert backend.update_faiss_index(incremental=True) == {
+        'mode': 'incremental', 'added': 0, 'updated': 0, 'removed': 0, 'total': 201}
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_saved_index_state_loads_back(backend, collection, mmap):
+    products = collection.products
+    backend.update_faiss_index()
+    products[3].update(title='linen shirt', updatedAt=IMPORTED_AT + timedelta(minutes=1))
+    backend.update_faiss_index(incremental=True)
+    saved = (dict(backend.product_ids), backend.next_faiss_id, backend.index_watermark,
+             set(backend.index_watermark_ids), indexed_titles(backend))
+
+    assert backend.load_index_state(mmap=mmap)
+
+    assert (dict(backend.product_ids), backend.next_faiss_id, backend.index_watermark,
+            set(backend.index_watermark_ids), indexed_titles(backend)) == saved
+    assert backend.index_mapped == mmap
+    # The loaded watermark carries on incremental updates where the saved one left off
+    assert backend.update_faiss_index(incremental=True)['updated'] == 0
+
+
+def random_catalog(count=50, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{
+        'title': f"product {i} ünïcode" if i % 7 == 0 else f"product {i}",
+        'category': str(rng.choice(['Topwear', 'Bottomwear', 'Ethnic'])),
+        'price': f"₹{rng.integers(100, 3000)}" if i % 9 else 'unknown',
+        'rating': round(float(rng.uniform(1, 5)), 1),
+        'reviews': str(rng.choice(['good quality', 'runs small', ''])),
+    } for i in range(count)]
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_catalog_snapshot_save_and_load(tmp_path, mmap):
+    snapshot = CatalogSnapshot()
+    products = random_catalog()
+    snapshot.set(np.arange(len(products)), products)
+    snapshot.remove([4, 8])
+
+    snapshot.save(str(tmp_path / 'catalog'))
+    loaded = CatalogSnapshot.load(str(tmp_path / 'catalog'), mmap=mmap)
+
+    assert len(loaded) == len(snapshot)
+    assert isinstance(loaded.prices, np.memmap) == mmap
+    for faiss_id in range(len(snapshot)):
+        assert loaded.product(faiss_id) == snapshot.product(faiss_id)
+    for constraints in [(None, None, None, False), (1500, 3.0, None, False), (None, None, 'wear', True)]:
+        np.testing.assert_array_equal(loaded.allowed_mask(*constraints), snapshot.allowed_mask(*constraints))
+
+
+def test_shared_index_refresh_does_not_wait_for_an_update(backend, monkeypatch):
+    backend.update_faiss_index()
+    monkeypatch.setattr(backend, 'SHARED_INDEX', True)
+    monkeypatch.setattr(backend, 'index_meta_mtime', None)
+    version = backend.index_version
+
+    # An update is running, the request goes on with the current index
+    with backend._index_lock:
+        monkeypatch.setattr(backend, '_index_checked_at', 0.0)
+        backend.refresh_shared_index()
+    assert backend.index_version == version
+
+    monkeypatch.setattr(backend, '_index_checked_at', 0.0)
+    backend.refresh_shared_index()
+    assert backend.index_version == version + 1
+    assert backend.index_mapped
@@ -0,0 +1,70 @@
+import pytest
+from language_id import BENCHMARK_SAMPLES, HELDOUT_SAMPLES, LanguageIdentifier
+
+LANGUAGES = ['en', 'es', 'fr', 'de', 'zh-cn', 'hi', 'ja', 'ru', 'ar', 'pt']
+
+
+@pytest.fixture(scope='module')
+def identifier():
+    return LanguageIdentifier(LANGUAGES)
+
+
+@pytest.mark.parametrize('expected, text', BENCHMARK_SAMPLES + HELDOUT_SAMPLES)
+def test_detects_labelled_messages(identifier, expected, text):
+    assert identifier.detect(text) == expected
+
+
+@pytest.mark.parametrize('text', [
+    "blue denim jeans", "suggest party wear", "ladies handbags sale", "buy kurta online",
+    "check delivery status", "summer dresses online", "nike running shoes", "winter jackets",
+])
+def test_product_only_queries_stay_english(identifier, text):
+    assert identifier.detect(text) == 'en'
+
+
+def test_single_accented_brand_is_not_evidence(identifier):
+    assert identifier.detect("café racer jacket") == 'en'
+
+
+def test_function_words_outweigh_english_ones(identifier):
+    assert identifier.detect("quiero comprar una falda") == 'es'
+    assert identifier.detect("je cherche une veste") == 'fr'
+
+
+@pytest.mark.parametrize('expected, text', [
+    ('es', "¿Tienen camisas?"), ('es', "¡Hola!"), ('es', "camisa de niño"), ('de', "Straße"),
+])
+def test_marks_of_one_language_are_enough(identifier, expected, text):
+    assert identifier.detect(text) == expected
+
+
+@pytest.mark.parametrize('text', [
+    "Was kostet das?", "Camisa azul", "chaussures noires", "blue denim jeans", "café racer jacket",
+])
+def test_messages_without_clear_evidence_go_to_the_fallback(text):
+    asked = []
+
+    def fallback(message):
+        asked.append(message)
+        return 'xx'
+    identifier = LanguageIdentifier(LANGUAGES, fallback=fallback)
+
+    assert identifier.detect(text) == 'xx'
+    # The fallback's answer is cached
+    assert identifier.detect(text) == 'xx'
+    assert asked == [text]
+
+
+def test_english_function_words_are_not_sent_to_the_fallback():
+    identifier = LanguageIdentifier(LANGUAGES, fallback=lambda message: pytest.fail(message))
+
+    assert identifier.detect("do you have white sneakers") == 'en'
+    assert identifier.detect("hola") == 'es'
+
+
+def test_failing_fallback_gives_the_default():
+    def fallback(message):
+        raise ConnectionError("translator unavailable")
+    identifier = LanguageIdentifier(LANGUAGES, fallback=fallback)
+
+    assert identifier.detect("Camisa azul") == 'en'
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from neighbour_graph import NeighbourGraph, build_neighbour_graph
+
+WORDS = ['red', 'blue', 'black', 'shirt', 'dress', 'jeans', 'jacket', 'cotton', 'silk', 'slim', 'men', 'women']
+
+
+@pytest.fixture(scope='module')
+def matrix():
+    rng = np.random.default_rng(0)
+    texts = [' '.join(rng.choice(WORDS, size=rng.integers(1, 5))) for _ in range(300)]
+    texts.append('zzz')  # Shares no term with any other product
+    return TfidfVectorizer().fit_transform(texts).tocsr()
+
+
+@pytest.fixture(scope='module')
+def product_ids(matrix):
+    return [f"p{i}" for i in range(matrix.shape[0])]
+
+
+def assert_same_graph(graph, other):
+    np.testing.assert_array_equal(graph.indptr, other.indptr)
+    np.testing.assert_array_equal(graph.neighbours, other.neighbours)
+    np.testing.assert_array_equal(graph.scores, other.scores)
+    assert list(graph.product_ids) == list(other.product_ids)
+
+
+def test_workers_build_the_same_graph(matrix, product_ids):
+    single = build_neighbour_graph(matrix, product_ids, k=10, chunk_size=32, processes=1)
+    pooled = build_neighbour_graph(matrix, product_ids, k=10, chunk_size=32, processes=3)
+
+    assert_same_graph(single, pooled)
+
+
+def test_chunk_size_does_not_change_the_graph(matrix, product_ids):
+    assert_same_graph(build_neighbour_graph(matrix, product_ids, k=10, chunk_size=7, processes=1),
+                      build_neighbour_graph(matrix, product_ids, k=10, chunk_size=1000, processes=1))
+
+
+def test_neighbours_are_the_most_similar_products(matrix, product_ids):
+    graph = build_neighbour_graph(matrix, product_ids, k=10, chunk_size=64, processes=1)
+    similarities = (matrix @ matrix.T).toarray()
+    np.fill_diagonal(similarities, 0)
+
+    assert graph.indptr.dtype == np.int64
+    assert graph.neighbours.dtype == np.int32
+    assert graph.scores.dtype == np.float16
+    for row in range(matrix.shape[0]):
+        neighbours, scores = graph.neighbours_of(row)
+        expected = np.sort(similarities[row][similarities[row] > 0])[::-1][:10]
+        assert row not in neighbours
+        np.testing.assert_allclose(scores.astype('float32'), expected, rtol=1e-3, atol=1e-3)
+        np.testing.assert_allclose(similarities[row][neighbours], scores.astype('float32'), rtol=1e-3, atol=1e-3)
+
+
+def test_product_without_shared_terms_has_no_neighbours(matrix, product_ids):
+    graph = build_neighbour_graph(matrix, product_ids, k=10, processes=1)
+
+    assert len(graph.neighbours_of(graph.row(product_ids[-1]))[0]) == 0
+    assert graph.row('unknown') is None
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_and_load(matrix, product_ids, tmp_path, mmap):
+    graph = build_neighbour_graph(matrix, product_ids, k=5, processes=1)
+    directory = str(tmp_path / 'graph')
+    graph.save(directory)
+    # Saving again replaces the graph
+    graph.save(directory)
+
+    loaded = NeighbourGraph.load(directory, mmap=mmap)
+    assert_same_graph(graph, loaded)
+    assert isinstance(loaded.neighbours, np.memmap) == mmap
+    assert loaded.row('p42') == 42
@@ -0,0 +1,142 @@
+import random
+import threading
+import time
+import pytest
+import product_availability
+from product_availability import AvailabilityIndex, check_product_availability
+from text_index import tokenize
+
+COLORS = ['red', 'blue', 'black', 'white', 'green']
+TYPES = ['shirt', 'dress', 'jeans', 'jacket', 'kurta']
+GENDERS = ['men', 'women', 'unisex']
+
+
+class FakeProducts:
+    """Products collection answering the queries AvailabilityIndex makes"""
+
+    def __init__(self, products, find_delay=0.0):
+        self.products = products
+        self.find_delay = find_delay
+        self.indexes = []
+        self.finds = 0
+
+    def create_index(self, field):
+        self.indexes.append(field)
+
+    def estimated_document_count(self):
+        return len(self.products)
+
+    def find_one(self, query, projection, sort):
+        field, _ = sort[0]
+        dated = [product for product in self.products if product.get(field) is not None]
+        return max(dated, key=lambda product: product[field], default=None)
+
+    def find(self, query, projection):
+        self.finds += 1
+        time.sleep(self.find_delay)
+        return [{field: product[field] for field in projection if field in product} for product in self.products]
+
+
+def random_products(count=300, seed=0):
+    rng = random.Random(seed)
+    return [{
+        'title': f"{rng.choice(COLORS)} {rng.choice(TYPES)} {i}",
+        'category': rng.choice(['Topwear', 'Bottomwear', 'Ethnic']),
+        'gender': rng.choice(GENDERS),
+        'price': f"₹{rng.randint(300, 3000)}",
+        'updatedAt': i,
+    } for i in range(count)]
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = FakeProducts(random_products())
+    monkeypatch.setattr(product_availability, 'get_collection', lambda name: collection)
+    return collection
+
+
+@pytest.mark.parametrize('name, color, gender', [
+    ('shirt', None, None), ('shirt', 'red', None), ('jeans', 'black', 'women'), ('jacket', 'green', 'men'),
+])
+def test_find_returns_products_with_every_word(collection, name, color, gender):
+    index = AvailabilityIndex()
+    found = index.find(name, color, gender, limit=None)
+
+    tokens = set(tokenize(name) + (tokenize(color) if color else []))
+    expected = [product for product in collection.products
+                if tokens <= set(tokenize(f"{product['title']} {product['category']}"))
+                and (gender is None or product['gender'] == gender)]
+    assert sorted(product['title'] for product in found) == sorted(product['title'] for product in expected)
+
+
+def test_find_ranks_and_limits(collection):
+    found = AvailabilityIndex().find('shirt', 'red', limit=5)
+
+    assert len(found) == 5
+    assert all({'red', 'shirt'} <= set(tokenize(product['title'])) for product in found)
+
+
+def test_first_refresh_creates_the_updated_at_index(collection):
+    AvailabilityIndex().find('shirt')
+
+    assert collection.indexes == ['updatedAt']
+
+
+def test_rebuild_runs_in_the_background(collection):
+    index = AvailabilityIndex(refresh_seconds=0)
+    assert index.find('kurta', 'white', limit=None)
+    before = len(index.find('kurta', 'white', limit=None))
+
+    collection.products.append({'title': 'white kurta new', 'category': 'Ethnic', 'gender': 'men', 'updatedAt': 1000})
+    collection.find_delay = 0.3
+    started = time.perf_counter()
+    # Served from the current snapshot while the new one is built
+    assert len(index.find('kurta', 'white', limit=None)) == before
+    assert time.perf_counter() - started < 0.2
+
+    deadline = time.monotonic() + 5
+    while index.signature[0] != len(collection.products) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert len(index.find('kurta', 'white', limit=None)) == before + 1
+
+
+def test_concurrent_lookups_start_one_rebuild(collection):
+    index = AvailabilityIndex(refresh_seconds=0)
+    index.find('shirt')
+    collection.products.append({'title': 'blue shirt new', 'category': 'Topwear', 'gender': 'men', 'updatedAt': 1000})
+    collection.find_delay = 0.2
+    finds = collection.finds
+
+    threads = [threading.Thread(target=index.find, args=('shirt',)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    time.sleep(0.4)
+
+    assert collection.finds == finds + 1
+
+
+def test_availability_answer(collection, monkeypatch):
+    monkeypatch.setattr(product_availability, 'availability_index', AvailabilityIndex())
+    collection.products[:] = [{'title': 'Blue Oxford Shirt', 'category': 'Topwear', 'gender': 'men', 'price': '₹999',
+                               'rating': 4.5, 'updatedAt': 1}]
+
+    assert check_product_availability("Do you have blue shirts for men?").startswith(
+        "Yes, we have Blue Oxford Shirt available for ₹999")
+    assert "couldn't find any red dress" in check_product_availability("Is the red dress available for women?")
+
+
+def test_failed_background_refresh_allows_the_next_one(collection, monkeypatch):
+    index = AvailabilityIndex(refresh_seconds=0)
+    index.find('shirt')
+
+    def failing_refresh(force=False):
+        raise ConnectionError("mongo unavailable")
+    monkeypatch.setattr(index, 'refresh', failing_refresh)
+    index.find('shirt')
+    deadline = time.monotonic() + 5
+    while index._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert not index._refreshing
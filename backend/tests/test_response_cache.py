@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+import numpy as np
+import pytest
+from fake_llm import FakeGeminiModel
+from response_cache import ResponseCache
+
+NAMESPACE = ('general', 'en')
+
+# Queries about returns point one way, queries about shipping another
+EMBEDDINGS = {
+    'how do i return an item': [1.0, 0.0, 0.0],
+    'how can i return an item': [0.99, 0.1, 0.0],
+    'how long does shipping take': [0.0, 1.0, 0.0],
+}
+
+
+def test_exact_hit_matches_normalized_query():
+    cache = ResponseCache()
+    cache.store(NAMESPACE, "How do I return an item?", "Within 30 days.")
+
+    assert cache.lookup(NAMESPACE, "  how do i   RETURN an item ") == "Within 30 days."
+    assert cache.lookup(('general', 'fr'), "How do I return an item?") is None
+
+
+def test_near_duplicate_hit():
+    cache = ResponseCache(similarity=0.95, embed_fn=EMBEDDINGS.get)
+    cache.store(NAMESPACE, "How do I return an item?", "Within 30 days.")
+
+    assert cache.lookup(NAMESPACE, "How can I return an item?") == "Within 30 days."
+    assert cache.lookup(NAMESPACE, "How long does shipping take?") is None
+    assert cache.lookup(NAMESPACE, "How can I return an item?", semantic=False) is None
+    assert cache.stats()['near_hits'] == 1
+
+
+def test_single_flight_coalesces_concurrent_misses():
+    cache = ResponseCache()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "Within 30 days."
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute(NAMESPACE, "return policy", compute)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    # Let every caller find the first one's computation in flight
+    deadline = time.monotonic() + 5
+    while cache.stats()['coalesced'] < 7 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["Within 30 days."] * 8
+
+
+def test_failed_computation_is_not_cached():
+    cache = ResponseCache()
+
+    def fail():
+        raise RuntimeError("quota exceeded")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute(NAMESPACE, "return policy", fail)
+    assert cache.get_or_compute(NAMESPACE, "return policy", lambda: "Within 30 days.") == "Within 30 days."
+
+
+def test_async_single_flight():
+    cache = ResponseCache()
+    model = FakeGeminiModel("Within 30 days.", delay=0.05)
+
+    async def compute():
+        return (await model.generate_content_async("return policy")).text
+
+    async def main():
+        return await asyncio.gather(*[cache.get_or_compute_async(NAMESPACE, "return policy", compute)
+                                      for _ in range(5)])
+
+    assert asyncio.run(main()) == ["Within 30 days."] * 5
+    assert model.calls == 1
+    assert cache.stats()['coalesced'] == 4
+
+
+def test_gemini_response_is_cached(gemini):
+    first = gemini.get_gemini_response("What's trending this summer?", 'general')
+    second = gemini.get_gemini_response("what's trending this summer", 'general')
+
+    assert first == second == gemini.model.reply
+    assert gemini.model.calls == 1
+
+
+def test_concurrent_gemini_requests_share_one_call(gemini, monkeypatch):
+    monkeypatch.setattr(gemini, 'model', FakeGeminiModel("Linen shirts.", delay=0.1))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(gemini.get_gemini_response("summer trends", 'general')))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["Linen shirts."] * 5
+    assert gemini.model.calls == 1
+
+
+def test_near_duplicate_gemini_query_is_served_from_cache(gemini):
+    gemini.response_cache.embed_fn = lambda query: np.asarray(EMBEDDINGS[query])
+    gemini.get_gemini_response("How do I return an item?", 'general')
+
+    assert gemini.get_gemini_response("How can I return an item?", 'general') == gemini.model.reply
+    assert gemini.model.calls == 1
@@ -0,0 +1,107 @@
+import json
+import pytest
+from fake_llm import FakeGeminiModel
+
+REPLY = "Pair a linen shirt with chinos for summer."
+
+
+@pytest.fixture
+def streaming_model(gemini, monkeypatch):
+    model = FakeGeminiModel(REPLY, chunk_size=8)
+    monkeypatch.setattr(gemini, 'model', model)
+    return model
+
+
+def parse_events(body):
+    """(event name, data) of each server-sent event in a response body"""
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields.get('event', 'message'), json.loads(fields['data'])))
+    return events
+
+
+def test_chunks_arrive_in_order(gemini, streaming_model):
+    chunks = list(gemini.stream_gemini_response("summer outfit", 'fashion_advice'))
+
+    assert chunks == [REPLY[start:start + 8] for start in range(0, len(REPLY), 8)]
+    assert gemini.stream_metrics.stats()['streams'] >= 1
+
+
+def test_completed_stream_is_cached(gemini, streaming_model):
+    list(gemini.stream_gemini_response("summer outfit", 'fashion_advice'))
+
+    assert list(gemini.stream_gemini_response("Summer outfit?", 'fashion_advice')) == [REPLY]
+    assert streaming_model.calls == 1
+
+
+def test_streams_count_their_path(gemini, streaming_model):
+    before = gemini.gemini_stats()
+    list(gemini.stream_gemini_response("summer outfit", 'fashion_advice'))
+    list(gemini.stream_gemini_response("summer outfit", 'fashion_advice'))
+
+    after = gemini.gemini_stats()
+    assert after['gemini'] == before['gemini'] + 1
+    assert after['cache'] == before['cache'] + 1
+    assert after['error'] == before['error']
+
+
+def test_failed_stream_counts_an_error(gemini, monkeypatch):
+    def failing_reply(prompt):
+        raise RuntimeError("503 Service Unavailable")
+    monkeypatch.setattr(gemini, 'model', FakeGeminiModel(failing_reply))
+    before = gemini.gemini_stats()
+
+    assert len(list(gemini.stream_gemini_response("summer outfit", 'fashion_advice'))) == 1
+    assert gemini.gemini_stats()['error'] == before['error'] + 1
+
+
+def test_client_disconnect_keeps_breaker_closed_and_skips_cache(gemini, streaming_model):
+    stream = gemini.stream_gemini_response("summer outfit", 'fashion_advice')
+    assert next(stream) == REPLY[:8]
+    stream.close()
+
+    assert gemini.breaker.state == 'closed'
+    assert gemini.response_cache.lookup(('fashion_advice', 'en'), "summer outfit") is None
+
+
+@pytest.fixture
+def client(gemini, streaming_model, monkeypatch):
+    pytest.importorskip('googletrans')
+    import app as backend
+    from flask import Flask
+
+    monkeypatch.setattr(backend, 'detect_language', lambda text: 'en')
+    monkeypatch.setattr(backend, 'translate_text', lambda text, src, dest: text)
+    monkeypatch.setattr(backend, 'classify_message', lambda text: 'general')
+    flask_app = Flask(__name__)
+    flask_app.register_blueprint(backend.api)
+    return flask_app.test_client()
+
+
+def test_sse_events_end_with_done(client):
+    response = client.post('/api/chatbot/stream', json={'message': "What should I wear?", 'language': 'en'})
+
+    assert response.mimetype == 'text/event-stream'
+    events = parse_events(response.get_data(as_text=True))
+    assert ''.join(data['text'] for event, data in events[:-1]) == REPLY
+    assert [event for event, _ in events[:-1]] == ['message'] * (len(events) - 1)
+    assert events[-1] == ('done', {'language': 'en'})
+
+
+def test_sse_empty_message(client):
+    events = parse_events(client.post('/api/chatbot/stream', json={'message': '  '}).get_data(as_text=True))
+
+    assert events[-1] == ('done', {'language': 'en'})
+    assert len(events) == 2
+
+
+def test_sse_client_disconnect_stops_the_stream(client, gemini):
+    response = client.post('/api/chatbot/stream', json={'message': "What should I wear?"}, buffered=False)
+    body = iter(response.response)
+    first = next(body)
+    response.close()
+
+    assert json.loads(first.decode().split('data: ', 1)[1]) == {'text': REPLY[:8]}
+    assert gemini.breaker.state == 'closed'
+    assert gemini.response_cache.lookup(('general', 'en'), "What should I wear?") is None
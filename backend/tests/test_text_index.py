@@ -0,0 +1,66 @@
+import math
+import random
+import pytest
+from text_index import InvertedIndex, tokenize
+
+N_DOCS = 400
+
+
+def random_corpus(vocabulary_size, max_length, seed=0):
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(vocabulary_size)]
+    return vocabulary, [' '.join(rng.choice(vocabulary) for _ in range(rng.randint(1, max_length)))
+                        for _ in range(N_DOCS)]
+
+
+def build_index(documents):
+    index = InvertedIndex()
+    for doc_id, text in enumerate(documents):
+        index.add(doc_id, text)
+    return index
+
+
+def brute_force(index, documents, tokens, k, within=None):
+    """Every matching document scored by InvertedIndex.score, best first, ties by id"""
+    candidates = [doc_id for doc_id, text in enumerate(documents)
+                  if set(tokenize(text)) & set(tokens) and (within is None or doc_id in within)]
+    ranked = sorted(((index.score(doc_id, tokens), doc_id) for doc_id in candidates), key=lambda item: (-item[0], item[1]))
+    return [(doc_id, score) for score, doc_id in ranked[:k]]
+
+
+# A small vocabulary and short documents give many exactly tied scores
+@pytest.mark.parametrize('vocabulary_size, max_length', [(8, 3), (30, 6)])
+def test_top_k_matches_brute_force(vocabulary_size, max_length):
+    vocabulary, documents = random_corpus(vocabulary_size, max_length)
+    index = build_index(documents)
+    rng = random.Random(1)
+
+    for query in range(500):
+        tokens = rng.sample(vocabulary, rng.randint(1, 4))
+        k = rng.randint(1, 15)
+        within = sorted(rng.sample(range(N_DOCS), N_DOCS // 2)) if query % 3 == 0 else None
+        assert index.search(tokens, k=k, within=within) == brute_force(index, documents, tokens, k, within)
+
+
+def test_scores_follow_bm25():
+    documents = ["red shirt", "red red dress", "blue jeans for men", "red"]
+    index = build_index(documents)
+    average = sum(len(text.split()) for text in documents) / len(documents)
+
+    def bm25(doc_id, token):
+        words = documents[doc_id].split()
+        frequency = words.count(token)
+        document_frequency = sum(token in text.split() for text in documents)
+        idf = math.log(1 + (len(documents) - document_frequency + 0.5) / (document_frequency + 0.5))
+        norm = index.k1 * (1 - index.b + index.b * len(words) / average)
+        return idf * frequency * (index.k1 + 1) / (frequency + norm)
+
+    for doc_id, score in index.search(['red', 'shirt'], k=None):
+        assert score == pytest.approx(bm25(doc_id, 'red') + bm25(doc_id, 'shirt'))
+
+
+def test_and_mode_requires_every_token():
+    index = build_index(["red shirt", "red dress", "blue shirt", "red shirt red"])
+
+    assert sorted(doc_id for doc_id, _ in index.search(tokenize("red shirts"), mode='and')) == [0, 3]
+    assert index.search_all(tokenize("red shirts"), within=[3]) == [3]
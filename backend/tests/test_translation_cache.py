@@ -0,0 +1,78 @@
+import pytest
+from translation_cache import CachedTranslator, TranslationMemory
+
+
+class FakeTranslateBatch:
+    """Outbound translation that upper-cases texts and records every batch"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts, src, dest):
+        self.batches.append(list(texts))
+        return [f"{dest}:{text.upper()}" for text in texts]
+
+
+@pytest.fixture
+def outbound():
+    return FakeTranslateBatch()
+
+
+def test_misses_go_out_in_one_batch(outbound):
+    translator = CachedTranslator(outbound)
+
+    results = translator.translate_many(["red shirt", "blue jeans", "red shirt"], 'en', 'es')
+
+    assert results == ["es:RED SHIRT", "es:BLUE JEANS", "es:RED SHIRT"]
+    assert outbound.batches == [["red shirt", "blue jeans"]]
+
+
+def test_cached_translations_are_not_sent_again(outbound):
+    translator = CachedTranslator(outbound)
+    translator.translate_many(["red shirt"], 'en', 'es')
+
+    assert translator.translate_many(["red shirt", "green scarf"], 'en', 'es') == ["es:RED SHIRT", "es:GREEN SCARF"]
+    assert outbound.batches == [["red shirt"], ["green scarf"]]
+    assert translator.translate("red shirt", 'en', 'es') == "es:RED SHIRT"
+    assert translator.stats()['outbound_calls'] == 2
+
+
+def test_language_pairs_are_cached_separately(outbound):
+    translator = CachedTranslator(outbound)
+    translator.translate("red shirt", 'en', 'es')
+
+    assert translator.translate("red shirt", 'en', 'fr') == "fr:RED SHIRT"
+    assert translator.translate("red shirt", 'en', 'en') == "red shirt"
+    assert len(outbound.batches) == 2
+
+
+def test_lines_are_translated_once_and_layout_kept(outbound):
+    translator = CachedTranslator(outbound)
+    first = "I found:\n\n1. Red shirt - ₹499\n   Category: Shirts\n"
+    second = "I found:\n\n1. Blue jeans - ₹999\n   Category: Shirts\n"
+
+    assert translator.translate(first, 'en', 'hi') == "hi:I FOUND:\n\nhi:1. RED SHIRT - ₹499\n   hi:CATEGORY: SHIRTS\n"
+    translator.translate(second, 'en', 'hi')
+
+    assert outbound.batches == [["I found:", "1. Red shirt - ₹499", "Category: Shirts"], ["1. Blue jeans - ₹999"]]
+
+
+def test_memory_persists_between_instances(outbound, tmp_path):
+    path = str(tmp_path / "translations.sqlite3")
+    CachedTranslator(outbound, TranslationMemory(path)).translate("red shirt", 'en', 'es')
+
+    memory = TranslationMemory(path)
+    assert CachedTranslator(outbound, memory).translate("red shirt", 'en', 'es') == "es:RED SHIRT"
+    assert len(outbound.batches) == 1
+    assert memory.stats()['disk_hits'] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "translations.sqlite3"), max_size=2, memory_size=1)
+    memory.set_many([("one", "uno"), ("two", "dos")], 'en', 'es')
+    memory.get("one", 'en', 'es')
+    memory.set_many([("three", "tres")], 'en', 'es')
+
+    assert len(memory) == 2
+    assert TranslationMemory(memory.path).get("two", 'en', 'es') is None
+    assert TranslationMemory(memory.path).get("one", 'en', 'es') == "uno"
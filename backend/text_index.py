@@ -0,0 +1,220 @@
+import heapq
+import math
+import re
+from bisect import bisect_left
+from collections import Counter
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# BM25 term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def normalize_token(token):
+    """Fold simple plurals, so 'shirts' and 'shirt' index the same"""
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Lowercased, plural-folded alphanumeric tokens of a text"""
+    if not isinstance(text, str):
+        text = '' if text is None else str(text)
+    return [normalize_token(token) for token in TOKEN_RE.findall(text.lower())]
+
+
+def contains(posting, doc_id):
+    """Whether a sorted posting list holds a document id"""
+    position = bisect_left(posting, doc_id)
+    return position < len(posting) and posting[position] == doc_id
+
+
+class InvertedIndex:
+    """
+    Token -> posting list of document ids, with BM25 ranking
+
+    Documents must be added in increasing id order, which keeps every posting list
+    sorted. Each posting list has a parallel list of the token's frequency in each
+    document, used for BM25 scoring.
+
+    Args:
+        k1 (float): BM25 term frequency saturation
+        b (float): BM25 document length normalization
+    """
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.frequencies = {}
+        self.max_frequency = {}
+        self.doc_lengths = {}
+        self.total_length = 0
+        self.min_length = None
+        self.doc_count = 0
+
+    def add(self, doc_id, text):
+        tokens = tokenize(text)
+        for token, count in Counter(tokens).items():
+            self.postings.setdefault(token, []).append(doc_id)
+            self.frequencies.setdefault(token, []).append(count)
+            self.max_frequency[token] = max(self.max_frequency.get(token, 0), count)
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+        self.min_length = len(tokens) if self.min_length is None else min(self.min_length, len(tokens))
+        self.doc_count += 1
+
+    def search_all(self, tokens, limit=None, within=None):
+        """
+        Ids of the documents containing every token, in id order
+
+        Args:
+            tokens (list): Normalized tokens, see tokenize()
+            limit (int): Stop after this many matches
+            within (list): Sorted ids (e.g. another index's posting list) to
+                restrict the result to
+        """
+        tokens = list(dict.fromkeys(tokens))
+        if not tokens:
+            return []
+        lists = [self.postings.get(token, []) for token in tokens]
+        if within is not None:
+            lists.append(within)
+        lists.sort(key=len)
+        if not lists[0]:
+            return []
+        # Walk the shortest posting list, binary-searching the others
+        found = []
+        for doc_id in lists[0]:
+            if all(contains(posting, doc_id) for posting in lists[1:]):
+                found.append(doc_id)
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+    def idf(self, token):
+        document_frequency = len(self.postings.get(token, ()))
+        return math.log(1 + (self.doc_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def _term_score(self, idf, frequency, length):
+        average = self.total_length / self.doc_count if self.doc_count else 1
+        norm = self.k1 * (1 - self.b + self.b * length / max(average, 1e-9))
+        return idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+    def _frequency(self, token, doc_id):
+        posting = self.postings.get(token, [])
+        position = bisect_left(posting, doc_id)
+        if position < len(posting) and posting[position] == doc_id:
+            return self.frequencies[token][position]
+        return 0
+
+    def score(self, doc_id, tokens):
+        """BM25 score of a document for a query"""
+        length = self.doc_lengths.get(doc_id, 0)
+        parts = []
+        for token in dict.fromkeys(tokens):
+            frequency = self._frequency(token, doc_id)
+            if frequency:
+                parts.append(self._term_score(self.idf(token), frequency, length))
+        # fsum doesn't depend on the order of the terms, so every search path scores alike
+        return math.fsum(parts)
+
+    def search(self, tokens, k=10, mode='or', within=None):
+        """
+        Best matching documents by BM25 score
+
+        Args:
+            tokens (list): Normalized tokens, see tokenize()
+            k (int): Number of results, None for every match
+            mode (str): 'and' to match documents with every token, 'or' with any
+            within (list): Sorted ids to restrict the result to
+
+        Returns:
+            list: (doc_id, score) pairs, best first (ties by id)
+        """
+        tokens = list(dict.fromkeys(tokens))
+        if mode == 'and':
+            scored = ((self.score(doc_id, tokens), doc_id) for doc_id in self.search_all(tokens, within=within))
+            return self._top(scored, k)
+        if mode != 'or':
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        tokens = [token for token in tokens if token in self.postings]
+        if not tokens:
+            return []
+        if k is None:
+            candidates = sorted(set().union(*(self.postings[token] for token in tokens)))
+            if within is not None:
+                candidates = [doc_id for doc_id in candidates if contains(within, doc_id)]
+            return self._top(((self.score(doc_id, tokens), doc_id) for doc_id in candidates), None)
+        return self._search_or_top_k(tokens, k, within)
+
+    def _search_or_top_k(self, tokens, k, within):
+        # MaxScore: terms are ordered by their highest possible score. Once the k-th
+        # best score exceeds the sum of the weakest terms' bounds, a document holding
+        # only those terms cannot make the top k, so their posting lists are no
+        # longer walked, only probed for documents found through the other terms.
+        idfs = {token: self.idf(token) for token in tokens}
+        bounds = {
+            token: self._term_score(idfs[token], self.max_frequency[token], self.min_length)
+            for token in tokens
+        }
+        tokens.sort(key=bounds.get)
+        cumulative = []
+        total = 0.0
+        for token in tokens:
+            total += bounds[token]
+            cumulative.append(total)
+
+        cursors = [0] * len(tokens)
+        heap = []  # (score, -doc_id), worst of the top k first
+        threshold = 0.0
+        essential = 0  # Terms before this index are only probed
+        while essential < len(tokens):
+            doc_id = None
+            for i in range(essential, len(tokens)):
+                posting = self.postings[tokens[i]]
+                if cursors[i] < len(posting) and (doc_id is None or posting[cursors[i]] < doc_id):
+                    doc_id = posting[cursors[i]]
+            if doc_id is None:
+                break
+
+            length = self.doc_lengths[doc_id]
+            parts = []
+            for i in range(essential, len(tokens)):
+                token = tokens[i]
+                posting = self.postings[token]
+                if cursors[i] < len(posting) and posting[cursors[i]] == doc_id:
+                    parts.append(self._term_score(idfs[token], self.frequencies[token][cursors[i]], length))
+                    cursors[i] += 1
+            if within is not None and not contains(within, doc_id):
+                continue
+            score = math.fsum(parts)
+            for i in range(essential - 1, -1, -1):
+                # Only skip documents that can't even tie, ties go to the lower id
+                if len(heap) >= k and score + cumulative[i] < threshold:
+                    break
+                frequency = self._frequency(tokens[i], doc_id)
+                if frequency:
+                    parts.append(self._term_score(idfs[tokens[i]], frequency, length))
+                    score = math.fsum(parts)
+
+            if len(heap) < k:
+                heapq.heappush(heap, (score, -doc_id))
+            elif (score, -doc_id) > heap[0]:
+                heapq.heapreplace(heap, (score, -doc_id))
+            if len(heap) >= k:
+                threshold = heap[0][0]
+                while essential < len(tokens) and cumulative[essential] < threshold:
+                    essential += 1
+        return [(-negative_id, score) for score, negative_id in sorted(heap, reverse=True)]
+
+    @staticmethod
+    def _top(scored, k):
+        if k is None:
+            ranked = sorted(scored, key=lambda item: (-item[0], item[1]))
+        else:
+            ranked = heapq.nsmallest(k, scored, key=lambda item: (-item[0], item[1]))
+        return [(doc_id, score) for score, doc_id in ranked]
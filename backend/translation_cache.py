@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import threading
+import time
+from query_cache import LRUCache
+
+
+class TranslationMemory:
+    """
+    Persistent (text, source language, target language) -> translation cache
+
+    Translations are kept in a SQLite file, with an in-memory LRU in front of it.
+    When the file holds more than `max_size` entries the least recently used are
+    evicted; entries served from the in-memory LRU don't refresh their on-disk
+    use time, so on-disk recency is approximate.
+
+    Args:
+        path (str): SQLite file, None to keep translations in memory only
+        max_size (int): Entries kept on disk
+        memory_size (int): Entries kept in the in-memory LRU
+    """
+
+    def __init__(self, path=None, max_size=50000, memory_size=5000):
+        self.path = path
+        self.max_size = max_size
+        self.memory = LRUCache(memory_size)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._connection = None
+        self.disk_hits = 0
+
+    def _db(self):
+        # SQLite connections must not be shared with a forked child
+        if self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " source TEXT NOT NULL, src TEXT NOT NULL, dest TEXT NOT NULL,"
+                " translation TEXT NOT NULL, last_used REAL NOT NULL,"
+                " PRIMARY KEY (source, src, dest))")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+            self._connection.commit()
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, text, src, dest):
+        key = (text, src, dest)
+        translation = self.memory.get(key)
+        if translation is not None or self.path is None:
+            return translation
+
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT translation FROM translations WHERE source = ? AND src = ? AND dest = ?",
+                             key).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE translations SET last_used = ? WHERE source = ? AND src = ? AND dest = ?",
+                       (time.time(), *key))
+            db.commit()
+            self.disk_hits += 1
+        self.memory.set(key, row[0])
+        return row[0]
+
+    def set_many(self, entries, src, dest):
+        """Store (text, translation) pairs for one language pair"""
+        entries = list(entries)
+        for text, translation in entries:
+            self.memory.set((text, src, dest), translation)
+        if self.path is None or not entries:
+            return
+
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)",
+                           [(text, src, dest, translation, now) for text, translation in entries])
+            excess = db.execute("SELECT COUNT(*) FROM translations").fetchone()[0] - self.max_size
+            if excess > 0:
+                db.execute("DELETE FROM translations WHERE rowid IN "
+                           "(SELECT rowid FROM translations ORDER BY last_used LIMIT ?)", (excess,))
+            db.commit()
+
+    def __len__(self):
+        if self.path is None:
+            return len(self.memory)
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def stats(self):
+        return {**self.memory.stats(), 'disk_hits': self.disk_hits, 'stored': len(self)}
+
+
+def split_line(line):
+    """Split a line into (leading whitespace, content, trailing whitespace)"""
+    content = line.strip()
+    if not content:
+        return line, '', ''
+    start = line.index(content)
+    return line[:start], content, line[start + len(content):]
+
+
+class CachedTranslator:
+    """
+    Translates through a TranslationMemory, sending only the misses out in batches
+
+    Multi-line texts are translated line by line, so lines shared between
+    responses (list items, product fields) are only translated once, and all the
+    untranslated lines of a call go out in a single batch.
+
+    Args:
+        translate_batch: `(texts, src, dest) -> list of translations`, the outbound call
+        memory (TranslationMemory): Cache of translated texts
+    """
+
+    def __init__(self, translate_batch, memory=None):
+        self.translate_batch = translate_batch
+        self.memory = memory if memory is not None else TranslationMemory()
+        self.outbound_calls = 0
+        self.outbound_texts = 0
+
+    def translate(self, text, src, dest):
+        return self.translate_many([text], src, dest)[0]
+
+    def translate_many(self, texts, src, dest):
+        """Translate texts from src to dest, with at most one call to translate_batch"""
+        if src == dest:
+            return list(texts)
+
+        results = [self.memory.get(text, src, dest) for text in texts]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        # Untranslated lines of every text that missed the cache
+        split_texts = {i: [split_line(line) for line in texts[i].split('\n')] for i in pending}
+        lines = {}
+        for parts in split_texts.values():
+            for _, content, _ in parts:
+                if content and content not in lines:
+                    lines[content] = self.memory.get(content, src, dest)
+        missing = [content for content, translation in lines.items() if translation is None]
+
+        if missing:
+            self.outbound_calls += 1
+            self.outbound_texts += len(missing)
+            translated = self.translate_batch(missing, src, dest)
+            lines.update(zip(missing, translated))
+            self.memory.set_many(zip(missing, translated), src, dest)
+
+        for i, parts in split_texts.items():
+            results[i] = '\n'.join(lead + (lines[content] if content else '') + trail
+                                   for lead, content, trail in parts)
+        self.memory.set_many(((texts[i], results[i]) for i in pending if '\n' in texts[i]), src, dest)
+        return results
+
+    def stats(self):
+        return {**self.memory.stats(), 'outbound_calls': self.outbound_calls, 'outbound_texts': self.outbound_texts}